@@ -21,8 +21,106 @@ class Settings:
     
     # Cache Settings
     CACHE_TTL: int = 300  # 5 minutes
+    CACHE_ENABLED: bool = os.getenv("CACHE_ENABLED", "True").lower() == "true"
+    CACHE_DIR: str = os.getenv("CACHE_DIR", "cache")
+    CACHE_MAX_ENTRIES: int = int(os.getenv("CACHE_MAX_ENTRIES", "2048"))
+    CACHE_TTLS: dict = {
+        "price": 60,  # /coins/markets rows (batch analysis, watchlist)
+        "search": 86400,  # name -> coin id rarely changes
+        "coin": CACHE_TTL,
+        "protocol": CACHE_TTL,
+        "protocols": 3600,
+        "coin_list": 3600,
+        "repo": 3600,
+        "social": 900,
+        "llm": int(os.getenv("LLM_CACHE_TTL", "86400")),
+    }
+    CACHE_DISK_LIMITS: dict = {
+        "llm": int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000")),
+    }
+    
+    # LLM completion cache
+    LLM_CACHE_ENABLED: bool = os.getenv("LLM_CACHE_ENABLED", "True").lower() == "true"
+    LLM_CACHE_QUANTIZE: bool = os.getenv("LLM_CACHE_QUANTIZE", "False").lower() == "true"
+    LLM_QUANTIZE_DIGITS: int = int(os.getenv("LLM_QUANTIZE_DIGITS", "2"))  # significant figures kept
+    LLM_COST_PER_1K_TOKENS: float = float(os.getenv("LLM_COST_PER_1K_TOKENS", "0.002"))
+    
+    # Full analysis cache (stale-while-revalidate, seconds)
+    ANALYSIS_CACHE_FRESH: int = int(os.getenv("ANALYSIS_CACHE_FRESH", str(CACHE_TTL)))
+    ANALYSIS_CACHE_STALE: int = int(os.getenv("ANALYSIS_CACHE_STALE", "1800"))
+    ANALYSIS_CACHE_MAX_ENTRIES: int = int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", "512"))
+    
+    # Aggregation Settings
+    ANALYSIS_DEADLINE: float = float(os.getenv("ANALYSIS_DEADLINE", "15"))  # seconds for the whole fan-out
+    SOURCE_TIMEOUT: float = float(os.getenv("SOURCE_TIMEOUT", "10"))  # default per-source budget
+    QUICK_SCORE_DEADLINE: float = float(os.getenv("QUICK_SCORE_DEADLINE", "2"))  # /quick-score fan-out
+    
+    # Upstream rate limits: (requests per second, burst)
+    RATE_LIMITS: dict = {
+        "coingecko": (0.5, 5),  # free tier ~30/min
+        "defillama": (5.0, 10),
+        "github": (1.3, 10),  # core REST API 5000/h with a token
+        "github_search": (0.5, 5),  # search API 30/min
+        "twitter": (0.5, 5),  # recent search 450/15min
+        "openrouter": (5.0, 10),
+    }
+    RATE_LIMIT_MAX_RETRIES: int = int(os.getenv("RATE_LIMIT_MAX_RETRIES", "3"))
+    RATE_LIMIT_BACKOFF_BASE: float = float(os.getenv("RATE_LIMIT_BACKOFF_BASE", "0.5"))
+    RATE_LIMIT_MAX_WAIT: float = float(os.getenv("RATE_LIMIT_MAX_WAIT", "30"))  # when no request deadline applies
+    
+    # Showcase warmer: re-analyze showcase projects in the background
+    SHOWCASE_WARM_ENABLED: bool = os.getenv("SHOWCASE_WARM_ENABLED", "True").lower() == "true"
+    SHOWCASE_WARM_INTERVAL: int = int(os.getenv("SHOWCASE_WARM_INTERVAL", "240"))
+    SHOWCASE_WARM_CONCURRENCY: int = int(os.getenv("SHOWCASE_WARM_CONCURRENCY", "2"))
+    
+    # Watchlist monitor: batched market refresh (seconds)
+    WATCHLIST_REFRESH_INTERVAL: int = int(os.getenv("WATCHLIST_REFRESH_INTERVAL", "300"))
+    
+    # Batch analysis: projects analyzed at once per /analyze/batch request
+    BATCH_CONCURRENCY: int = int(os.getenv("BATCH_CONCURRENCY", "4"))
+    BATCH_MAX_CONCURRENCY: int = int(os.getenv("BATCH_MAX_CONCURRENCY", "16"))  # cap for the request's `concurrency`
+    
+    # AI analysis mode: "parallel", "consolidated" (single JSON completion) or "sequential"
+    ROMA_MODE: str = os.getenv("ROMA_MODE", "parallel").lower()
+    
+    # HTTP Client Pool Settings
+    HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+    HTTP_MAX_KEEPALIVE: int = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+    HTTP_KEEPALIVE_EXPIRY: float = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+    HTTP_TIMEOUT: float = float(os.getenv("HTTP_TIMEOUT", "10"))
+    HTTP2_ENABLED: bool = os.getenv("HTTP2_ENABLED", "True").lower() == "true"
+    
+    # DefiLlama protocol catalogue refresh interval (seconds)
+    DEFILLAMA_CATALOGUE_TTL: int = int(os.getenv("DEFILLAMA_CATALOGUE_TTL", "3600"))
+    
+    # CoinGecko coin list (contract index) refresh interval (seconds)
+    COINGECKO_COIN_LIST_TTL: int = int(os.getenv("COINGECKO_COIN_LIST_TTL", "3600"))
+    COIN_SEARCH_RANKED_COINS: int = int(os.getenv("COIN_SEARCH_RANKED_COINS", "1000"))  # top coins ranked by market cap
     
     # Report Settings
     REPORTS_DIR: str = "reports"
+    DATA_DIR: str = os.getenv("DATA_DIR", "data")  # persistent state (report index, ...)
+    REPORT_WORKERS: int = int(os.getenv("REPORT_WORKERS", "2"))  # render processes
+    REPORT_QUEUE_SIZE: int = int(os.getenv("REPORT_QUEUE_SIZE", "16"))  # pending jobs before 503
+    REPORT_JOB_TTL: int = int(os.getenv("REPORT_JOB_TTL", "3600"))  # job status retention (seconds)
+    
+    # Report retention: evict least recently downloaded reports past the quota or max age
+    REPORTS_MAX_BYTES: int = int(os.getenv("REPORTS_MAX_BYTES", str(1024 ** 3)))  # 1 GB
+    REPORTS_MAX_AGE: int = int(os.getenv("REPORTS_MAX_AGE", str(30 * 86400)))  # since last access (seconds)
+    REPORT_RETENTION_INTERVAL: int = int(os.getenv("REPORT_RETENTION_INTERVAL", "300"))
+    REPORT_RETENTION_BATCH: int = int(os.getenv("REPORT_RETENTION_BATCH", "100"))  # files per step
+    REPORT_RETENTION_GRACE: int = int(os.getenv("REPORT_RETENTION_GRACE", "600"))  # never evict newer files
+    
+    def source_timeout(self, source: str) -> float:
+        """Per-source budget, overridable with e.g. GITHUB_TIMEOUT=5"""
+        return float(os.getenv(f"{source.upper()}_TIMEOUT", self.SOURCE_TIMEOUT))
+    
+    def rate_limit(self, upstream: str) -> tuple:
+        """(rate, burst) for an upstream, overridable with e.g. COINGECKO_RATE_LIMIT=8.3:50"""
+        override = os.getenv(f"{upstream.upper()}_RATE_LIMIT")
+        if override:
+            rate, _, burst = override.partition(":")
+            return float(rate), float(burst or rate)
+        return self.RATE_LIMITS.get(upstream, (5.0, 10))
     
 settings = Settings()
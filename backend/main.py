@@ -2,16 +2,48 @@ from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
+from contextlib import asynccontextmanager
+import asyncio
 import os
 
 from config import settings
 from routers import analysis, projects, reports
 from models.schemas import HealthResponse
+from services.http_client import http_clients
+from services.coingecko_service import CoinGeckoService
+from services.defillama_service import DefiLlamaService
+from services.cache_service import response_cache
+from services.completion_cache import completion_cache
+from services.render_queue import render_queue
+from services.report_index import report_index
+from services.report_retention import report_retention
+from services.watchlist_service import watchlist, watchlist_monitor
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open shared upstream resources on startup and release them on shutdown"""
+    await http_clients.startup()
+    DefiLlamaService().warm_catalogue()
+    CoinGeckoService().warm_coin_list()
+    await asyncio.to_thread(report_index.backfill)
+    report_retention.start()
+    projects.showcase_warmer.start()
+    watchlist_monitor.start()
+    yield
+    await watchlist_monitor.stop()
+    await projects.showcase_warmer.stop()
+    await report_retention.stop()
+    await http_clients.shutdown()
+    render_queue.shutdown()
+    response_cache.close()
+    report_index.close()
+    watchlist.close()
 
 app = FastAPI(
     title="DeepDive AI - Crypto Research Agent",
     description="AI-powered crypto project analysis using Sentient ROMA",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS Middleware
@@ -26,8 +58,17 @@ app.add_middleware(
 # Create reports directory if it doesn't exist
 os.makedirs(settings.REPORTS_DIR, exist_ok=True)
 
+class ReportFiles(StaticFiles):
+    """Report downloads, recorded as accesses for retention"""
+    
+    async def get_response(self, path: str, scope):
+        response = await super().get_response(path, scope)
+        if response.status_code == 200:
+            await asyncio.to_thread(report_index.touch, os.path.basename(path))
+        return response
+
 # Mount static files for reports
-app.mount("/reports", StaticFiles(directory=settings.REPORTS_DIR), name="reports")
+app.mount("/reports", ReportFiles(directory=settings.REPORTS_DIR), name="reports")
 
 # Include routers
 app.include_router(analysis.router, prefix="/api/v1", tags=["Analysis"])
@@ -52,6 +93,11 @@ async def health_check():
         "version": "1.0.0"
     }
 
+@app.get("/api/v1/cache/stats")
+async def cache_stats():
+    """Upstream cache hit/miss counters and LLM completion savings"""
+    return {**response_cache.get_stats(), "llm": completion_cache.get_stats()}
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -11,6 +11,7 @@ class InputType(str, Enum):
     PROJECT_NAME = "project_name"
     CONTRACT_ADDRESS = "contract_address"
     TWITTER_HANDLE = "twitter_handle"
+    COIN_ID = "coin_id"
 
 class AnalysisRequest(BaseModel):
     input: str = Field(..., description="Project name, contract address, or Twitter handle")
@@ -45,6 +46,13 @@ class TechnicalMetrics(BaseModel):
     contributors: Optional[int] = None
     last_commit_date: Optional[str] = None
 
+class DefiMetrics(BaseModel):
+    tvl: Optional[float] = None
+    chain_tvls: Dict[str, float] = {}
+    change_1d: Optional[float] = None
+    change_7d: Optional[float] = None
+    mcap_tvl_ratio: Optional[float] = None
+
 class TeamInfo(BaseModel):
     members: List[Dict[str, str]] = []
     linkedin_profiles: List[str] = []
@@ -82,7 +90,10 @@ class ProjectData(BaseModel):
     tokenomics: Tokenomics
     social_metrics: SocialMetrics
     technical_metrics: TechnicalMetrics
+    defi_metrics: DefiMetrics = DefiMetrics()
     team_info: TeamInfo
+    late_sources: List[str] = []  # sources that missed their time budget
+    missing_sources: List[str] = []  # sources that failed or returned no data
 
 class AnalysisResponse(BaseModel):
     project_data: ProjectData
@@ -91,11 +102,42 @@ class AnalysisResponse(BaseModel):
     risk_flags: RiskFlags
     investment_thesis: InvestmentThesis
     report_url: Optional[str] = None
+    report_job_id: Optional[str] = None  # poll /api/v1/reports/jobs/{id} for report_url
     analysis_timestamp: str
 
+class BatchAnalysisRequest(BaseModel):
+    projects: List[str] = Field(..., min_items=1, max_items=500, description="Project names, contract addresses, or Twitter handles")
+    concurrency: Optional[int] = Field(None, ge=1, description="Analyses run at once (capped by the server)")
+
 class ComparisonRequest(BaseModel):
     projects: List[str] = Field(..., min_items=2, max_items=3)
 
 class ComparisonResponse(BaseModel):
     projects: List[AnalysisResponse]
     comparative_summary: str
+    degraded_projects: List[str] = []  # analyzed with late or missing data sources
+    missing_projects: List[str] = []  # analysis failed
+    report_job_id: Optional[str] = None
+
+class ReportInfo(BaseModel):
+    filename: str
+    kind: str  # analysis | comparison
+    project: Optional[str] = None
+    created_at: str
+    size: int
+    content_hash: Optional[str] = None
+    analysis_id: Optional[str] = None  # render job that produced the report
+    url: str
+
+class ReportList(BaseModel):
+    reports: List[ReportInfo]
+    next_cursor: Optional[str] = None
+
+class ReportJob(BaseModel):
+    job_id: str
+    kind: str  # analysis | comparison
+    status: str  # queued | running | done | failed
+    report_url: Optional[str] = None
+    error: Optional[str] = None
+    created_at: str
+    finished_at: Optional[str] = None
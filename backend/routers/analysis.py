@@ -1,46 +1,50 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks
-from typing import Dict
+from fastapi import APIRouter, HTTPException, Response
+from fastapi.responses import StreamingResponse
+from typing import Any, Dict
+import asyncio
+import json
 import logging
+import time
 
-from models.schemas import AnalysisRequest, AnalysisResponse, ComparisonRequest, ComparisonResponse
+from config import settings
+from models.schemas import AnalysisRequest, AnalysisResponse, BatchAnalysisRequest, ComparisonRequest, ComparisonResponse
 from services.aggregation_service import AggregationService
-from services.report_service import ReportService
+from services.render_queue import RenderQueueFull, render_queue
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 aggregation_service = AggregationService()
-report_service = ReportService()
 
 @router.post("/analyze", response_model=AnalysisResponse)
-async def analyze_project(request: AnalysisRequest, background_tasks: BackgroundTasks):
+async def analyze_project(request: AnalysisRequest, response: Response):
     """
     Analyze a crypto project
     
     - **input**: Project name, contract address, or Twitter handle
     - **input_type**: Optional type specification (project_name, contract_address, twitter_handle)
     
-    Returns comprehensive analysis with AI-powered insights
+    Returns comprehensive analysis with AI-powered insights.
+    Cached results are served with `X-Cache-Status` (HIT/STALE/MISS) and `Age` headers;
+    `analysis_timestamp` is the time the analysis was produced. The PDF report is
+    rendered in the background; poll `/reports/jobs/{report_job_id}` for its URL.
     """
     try:
         logger.info(f"Analyzing project: {request.input}")
         
-        # Perform analysis
-        analysis = await aggregation_service.analyze_project(
+        # Perform analysis (served from cache when possible)
+        analysis, cache_status, age = await aggregation_service.get_analysis(
             request.input,
             request.input_type
         )
+        set_cache_headers(response, cache_status, age)
         
-        # Generate PDF report in background
-        def generate_pdf():
-            try:
-                filename = report_service.generate_report(analysis)
-                analysis.report_url = f"/reports/{filename}"
-                logger.info(f"Report generated: {filename}")
-            except Exception as e:
-                logger.error(f"Error generating report: {e}")
-        
-        background_tasks.add_task(generate_pdf)
+        # Queue the PDF report (the cached analysis itself is left untouched)
+        try:
+            job = render_queue.submit_report(analysis)
+            analysis = analysis.copy(update={"report_job_id": job.id})
+        except RenderQueueFull as e:
+            logger.warning(f"Skipping report for {request.input}: {e}")
         
         return analysis
     
@@ -48,8 +52,112 @@ async def analyze_project(request: AnalysisRequest, background_tasks: Background
         logger.error(f"Analysis error: {e}")
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
+@router.post("/analyze/stream")
+async def analyze_project_stream(request: AnalysisRequest):
+    """
+    Analyze a crypto project, streaming results as Server-Sent Events
+    
+    Emits one event per section as it arrives (token_metrics, tokenomics, tvl, github,
+    social, executive_summary, scores, risk_flags, investment_thesis), then `analysis`
+    with the full AnalysisResponse, `report` with the PDF link (omitted when the render
+    queue is full; `report_url` null with the job error when rendering fails), and
+    finally `done`.
+    Failures are sent as an `error` event.
+    """
+    logger.info(f"Streaming analysis for: {request.input}")
+    queue: asyncio.Queue = asyncio.Queue()
+    
+    async def emit(event: str, data: Any):
+        await queue.put((event, data))
+    
+    async def run():
+        try:
+            analysis, cache_status = await aggregation_service.stream_analysis(
+                request.input,
+                request.input_type,
+                emit
+            )
+            await emit("analysis", {"cache_status": cache_status, **analysis.dict()})
+            
+            try:
+                job = render_queue.submit_report(analysis)
+            except RenderQueueFull as e:
+                logger.warning(f"Skipping report for {request.input}: {e}")
+            else:
+                try:
+                    filename = await job.wait()
+                    await emit("report", {"report_url": f"/reports/{filename}", "report_job_id": job.id})
+                except RuntimeError as e:
+                    # The analysis was already delivered; a failed render only loses the PDF
+                    logger.error(f"Report render failed for {request.input}: {e}")
+                    await emit("report", {"report_url": None, "report_job_id": job.id, "status": job.status, "error": job.error})
+        except Exception as e:
+            logger.error(f"Streaming analysis error: {e}")
+            await emit("error", {"detail": f"Analysis failed: {str(e)}"})
+        finally:
+            await queue.put(None)
+    
+    async def event_stream():
+        task = asyncio.ensure_future(run())
+        try:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                event, data = item
+                yield f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+            yield "event: done\ndata: {}\n\n"
+        finally:
+            # Client went away: stop this stream (the cached analysis keeps refreshing)
+            if not task.done():
+                task.cancel()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/analyze/batch")
+async def analyze_batch(request: BatchAnalysisRequest):
+    """
+    Analyze up to 500 projects, streaming results as NDJSON
+    
+    - **projects**: Project names, contract addresses, or Twitter handles
+    - **concurrency**: Optional number of analyses run at once (default BATCH_CONCURRENCY)
+    
+    Writes one JSON line per project as soon as its analysis finishes (in completion
+    order, with `index` pointing back into `projects`), then a final summary line.
+    A failed project produces a line with `status: "error"`; the others continue.
+    """
+    concurrency = min(request.concurrency or settings.BATCH_CONCURRENCY, settings.BATCH_MAX_CONCURRENCY)
+    logger.info(f"Batch analysis of {len(request.projects)} projects (concurrency {concurrency})")
+    
+    async def result_stream():
+        started = time.time()
+        counts = {"ok": 0, "error": 0}
+        results = aggregation_service.analyze_batch(request.projects, concurrency)
+        try:
+            async for result in results:
+                counts[result["status"]] += 1
+                yield json.dumps(result, default=str) + "\n"
+        finally:
+            await results.aclose()
+        yield json.dumps({
+            "done": True,
+            "succeeded": counts["ok"],
+            "failed": counts["error"],
+            "elapsed": round(time.time() - started, 3),
+        }) + "\n"
+    
+    return StreamingResponse(
+        result_stream(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.post("/compare", response_model=ComparisonResponse)
-async def compare_projects(request: ComparisonRequest, background_tasks: BackgroundTasks):
+async def compare_projects(request: ComparisonRequest):
     """
     Compare 2-3 crypto projects side-by-side
     
@@ -69,15 +177,12 @@ async def compare_projects(request: ComparisonRequest, background_tasks: Backgro
         # Perform comparison
         comparison_data = await aggregation_service.compare_projects(request.projects)
         
-        # Generate comparison report in background
-        def generate_comparison_pdf():
-            try:
-                filename = report_service.generate_comparison_report(comparison_data)
-                logger.info(f"Comparison report generated: {filename}")
-            except Exception as e:
-                logger.error(f"Error generating comparison report: {e}")
-        
-        background_tasks.add_task(generate_comparison_pdf)
+        # Queue the comparison report
+        try:
+            job = render_queue.submit_comparison(comparison_data)
+            comparison_data["report_job_id"] = job.id
+        except RenderQueueFull as e:
+            logger.warning(f"Skipping comparison report: {e}")
         
         return ComparisonResponse(**comparison_data)
     
@@ -92,20 +197,17 @@ async def get_quick_score(project_name: str) -> Dict:
     """
     Get quick score for a project without full analysis
     
+    Uses only market and repository data with deterministic scoring (no LLM calls).
     Returns basic metrics and overall score
     """
     try:
-        # Simplified quick analysis
-        analysis = await aggregation_service.analyze_project(project_name)
-        
-        return {
-            "project_name": analysis.project_data.project_name,
-            "total_score": analysis.scores.total,
-            "risk_level": analysis.risk_flags.level,
-            "price": analysis.project_data.token_metrics.price,
-            "market_cap": analysis.project_data.token_metrics.market_cap
-        }
+        return await aggregation_service.quick_score(project_name)
     
     except Exception as e:
         logger.error(f"Quick score error: {e}")
         raise HTTPException(status_code=500, detail=f"Quick score failed: {str(e)}")
+
+def set_cache_headers(response: Response, cache_status: str, age: float):
+    """Expose analysis cache status and age to the client"""
+    response.headers["X-Cache-Status"] = cache_status
+    response.headers["Age"] = str(int(age))
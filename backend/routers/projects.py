@@ -1,32 +1,51 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request, Response
 from typing import List, Dict
+import asyncio
 import json
-import os
 import logging
 
+from routers.analysis import aggregation_service
+from services.showcase_store import make_etag, showcase_store
+from services.showcase_warmer import ShowcaseWarmer
+from services.watchlist_service import watchlist, watchlist_monitor
+
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-# In-memory storage for demo (in production, use a database)
-SHOWCASE_FILE = "showcase_projects.json"
+def current_showcase_projects() -> List[Dict]:
+    """Stored showcase projects, or the sample set while none were added"""
+    projects, _ = showcase_store.snapshot(get_sample_showcase_projects)
+    return projects
+
+# Keeps showcase analyses warm in the shared analysis cache (started by the app lifespan)
+showcase_warmer = ShowcaseWarmer(aggregation_service, current_showcase_projects)
 
 @router.get("/showcase")
-async def get_showcase_projects() -> List[Dict]:
+async def get_showcase_projects(request: Request, response: Response) -> List[Dict]:
     """
     Get list of pre-analyzed showcase projects
     
-    Returns 20+ projects with cached analysis results
+    Returns 20+ projects with cached analysis results; scores and risk levels
+    are live once the background warmer has analyzed them.
+    Served with an ETag; a matching If-None-Match gets 304 Not Modified.
     """
     try:
-        if os.path.exists(SHOWCASE_FILE):
-            with open(SHOWCASE_FILE, 'r') as f:
-                return json.load(f)
-        else:
-            # Return sample data if file doesn't exist
-            return get_sample_showcase_projects()
+        projects, etag = await asyncio.to_thread(showcase_store.snapshot, get_sample_showcase_projects)
     except Exception as e:
         logger.error(f"Error loading showcase projects: {e}")
         return get_sample_showcase_projects()
+    
+    if showcase_warmer.live:
+        projects = showcase_warmer.merge(projects)
+        etag = make_etag(json.dumps(projects, sort_keys=True, default=str).encode())
+    
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+        return Response(status_code=304, headers=headers)
+    
+    response.headers.update(headers)
+    return projects
 
 @router.post("/showcase")
 async def add_showcase_project(project_data: Dict) -> Dict:
@@ -36,16 +55,7 @@ async def add_showcase_project(project_data: Dict) -> Dict:
     Used to build the library of pre-analyzed projects
     """
     try:
-        projects = []
-        if os.path.exists(SHOWCASE_FILE):
-            with open(SHOWCASE_FILE, 'r') as f:
-                projects = json.load(f)
-        
-        projects.append(project_data)
-        
-        with open(SHOWCASE_FILE, 'w') as f:
-            json.dump(projects, f, indent=2)
-        
+        await asyncio.to_thread(showcase_store.append, project_data)
         return {"status": "success", "message": "Project added to showcase"}
     except Exception as e:
         logger.error(f"Error adding showcase project: {e}")
@@ -54,26 +64,64 @@ async def add_showcase_project(project_data: Dict) -> Dict:
 @router.get("/watchlist")
 async def get_watchlist() -> List[Dict]:
     """
-    Get user's watchlist projects
+    Get watchlist projects
     
-    Returns projects marked for daily monitoring
+    Returns watched projects with their latest market snapshot
+    (refreshed in batches every WATCHLIST_REFRESH_INTERVAL seconds)
     """
-    # Placeholder - in production, this would be user-specific
-    return []
+    try:
+        return await asyncio.to_thread(watchlist.all)
+    except Exception as e:
+        logger.error(f"Error loading watchlist: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/watchlist")
 async def add_to_watchlist(project_name: str) -> Dict:
     """
     Add a project to watchlist
     
-    Enables daily monitoring and alerts
+    Enables scheduled market monitoring
     """
-    # Placeholder implementation
+    coin_id = await aggregation_service.coingecko.search_coin(project_name.strip().lower())
+    if not coin_id:
+        raise HTTPException(status_code=404, detail=f"No CoinGecko coin found for {project_name}")
+    
+    try:
+        added = await asyncio.to_thread(watchlist.add, coin_id, project_name)
+    except Exception as e:
+        logger.error(f"Error adding to watchlist: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    if added:
+        watchlist_monitor.notify()
     return {
         "status": "success",
-        "message": f"{project_name} added to watchlist"
+        "coin_id": coin_id,
+        "message": f"{project_name} added to watchlist" if added else f"{project_name} is already on the watchlist"
     }
 
+@router.delete("/watchlist/{coin_id}")
+async def remove_from_watchlist(coin_id: str) -> Dict:
+    """
+    Remove a project from the watchlist
+    """
+    if not await asyncio.to_thread(watchlist.remove, coin_id):
+        raise HTTPException(status_code=404, detail="Project not on watchlist")
+    return {"status": "success", "message": f"{coin_id} removed from watchlist"}
+
+@router.get("/search")
+async def search_coins(q: str = Query(..., min_length=1), limit: int = Query(10, ge=1, le=50)) -> List[Dict]:
+    """
+    Autocomplete coin names, symbols and ids
+    
+    Answered from the in-memory coin index (no upstream calls); matches are
+    ranked exact, then prefix, then substring, by market cap within each tier.
+    Returns an empty list until the coin list has been loaded.
+    """
+    coingecko = aggregation_service.coingecko
+    coingecko.warm_coin_list()
+    return coingecko.search_index.suggest(q, limit)
+
 def get_sample_showcase_projects() -> List[Dict]:
     """Return sample showcase projects"""
     return [
@@ -1,26 +1,30 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from fastapi.responses import FileResponse
-from typing import List
+from datetime import datetime
+from typing import Optional
+import asyncio
 import os
 import logging
 
 from config import settings
-from models.schemas import AnalysisResponse
-from services.report_service import ReportService
+from models.schemas import AnalysisResponse, ReportJob, ReportList
+from services.render_queue import RenderQueueFull, render_queue
+from services.report_index import report_index
+from services.report_retention import report_retention
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
-report_service = ReportService()
 
 @router.post("/generate-report")
 async def generate_report(analysis: AnalysisResponse):
     """
     Generate PDF report from analysis data
     
-    Returns PDF file for immediate download
+    Returns PDF file for immediate download. Rendering goes through the shared
+    render queue; a full queue answers 503 with Retry-After.
     """
     try:
-        filename = report_service.generate_report(analysis)
+        filename = await render_queue.submit_report(analysis).wait()
         filepath = os.path.join(settings.REPORTS_DIR, filename)
         
         return FileResponse(
@@ -28,27 +32,62 @@ async def generate_report(analysis: AnalysisResponse):
             media_type="application/pdf",
             filename=f"{analysis.project_data.project_name}_analysis.pdf"
         )
+    except RenderQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
     except Exception as e:
         logger.error(f"Error generating report: {e}")
         raise HTTPException(status_code=500, detail=f"Report generation failed: {str(e)}")
 
-@router.get("/reports")
-async def list_reports() -> List[str]:
+@router.get("/reports/jobs/{job_id}", response_model=ReportJob)
+async def get_report_job(job_id: str):
     """
-    List all generated reports
+    Status of a queued report render
     
-    Returns list of available report filenames
+    Returns the job status and, once done, the report URL
+    """
+    job = render_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Report job not found")
+    return job.to_schema()
+
+@router.get("/reports", response_model=ReportList)
+async def list_reports(
+    project: Optional[str] = None,
+    kind: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200)
+):
+    """
+    List generated reports from the report index, most recent first
+    
+    - **project**: Only reports for this project (case-insensitive)
+    - **kind**: `analysis` or `comparison`
+    - **since** / **until**: Creation time range (ISO 8601)
+    - **cursor**: `next_cursor` from the previous page
+    
+    Returns one page of report metadata and the cursor of the next page
     """
     try:
-        reports_dir = settings.REPORTS_DIR
-        if not os.path.exists(reports_dir):
-            return []
-        
-        reports = [f for f in os.listdir(reports_dir) if f.endswith('.pdf')]
-        return sorted(reports, reverse=True)  # Most recent first
+        reports, next_cursor = await asyncio.to_thread(
+            report_index.list, project, kind, since, until, cursor, limit
+        )
+        return {"reports": reports, "next_cursor": next_cursor}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error listing reports: {e}")
-        return []
+        return {"reports": [], "next_cursor": None}
+
+@router.get("/reports/retention")
+async def retention_stats():
+    """
+    Report storage usage and retention statistics
+    
+    Returns current size against the quota and the space reclaimed so far
+    """
+    return await asyncio.to_thread(report_retention.get_stats)
 
 @router.get("/reports/{filename}")
 async def download_report(filename: str):
@@ -63,6 +102,7 @@ async def download_report(filename: str):
         if not os.path.exists(filepath):
             raise HTTPException(status_code=404, detail="Report not found")
         
+        await asyncio.to_thread(report_index.touch, filename)
         return FileResponse(
             filepath,
             media_type="application/pdf",
@@ -88,6 +128,7 @@ async def delete_report(filename: str):
             raise HTTPException(status_code=404, detail="Report not found")
         
         os.remove(filepath)
+        await asyncio.to_thread(report_index.remove, filename)
         return {"status": "success", "message": f"Report {filename} deleted"}
     except HTTPException:
         raise
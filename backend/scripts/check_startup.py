@@ -0,0 +1,85 @@
+"""
+Startup-time budget for the backend.
+
+Imports `main` in a fresh interpreter with `-X importtime`, prints the slowest
+modules and exits non-zero if the import takes longer than the budget or if a
+dependency that should load lazily was imported eagerly.
+
+Usage (from backend/):
+    python scripts/check_startup.py [--budget 1.5] [--runs 3] [--top 15]
+"""
+from typing import Dict, List, Tuple
+import argparse
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Heavy dependencies that must only load on first use
+LAZY_MODULES = ("reportlab", "matplotlib", "pandas", "numpy", "tweepy", "github")
+
+# Backend packages, reported separately from third-party imports
+OWN_MODULES = ("main", "config", "routers", "services", "models")
+
+
+def measure() -> Dict[str, Tuple[int, int]]:
+    """Import main once and return {module: (self_us, cumulative_us)}"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        sys.exit(f"Importing main failed:\n{result.stderr[-2000:]}")
+    
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def top(modules: Dict[str, Tuple[int, int]], own: bool, count: int) -> List[Tuple[str, int]]:
+    selected = [
+        (name, cumulative) for name, (_, cumulative) in modules.items()
+        if (name.split(".")[0] in OWN_MODULES) == own
+    ]
+    return sorted(selected, key=lambda item: item[1], reverse=True)[:count]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget", type=float, default=float(os.getenv("STARTUP_BUDGET", "1.5")),
+                        help="maximum import time of main in seconds (default: STARTUP_BUDGET or 1.5)")
+    parser.add_argument("--runs", type=int, default=3, help="take the fastest of N runs")
+    parser.add_argument("--top", type=int, default=15, help="modules to list per group")
+    args = parser.parse_args()
+    
+    runs = [measure() for _ in range(args.runs)]
+    modules = min(runs, key=lambda run: run["main"][1])
+    total = modules["main"][1] / 1e6
+    
+    for title, own in (("Backend modules", True), ("Third-party modules", False)):
+        print(f"{title} (cumulative ms):")
+        for name, cumulative in top(modules, own, args.top):
+            print(f"  {cumulative / 1000:9.1f}  {name}")
+    
+    failures = []
+    eager = sorted({name.split(".")[0] for name in modules} & set(LAZY_MODULES))
+    if eager:
+        failures.append(f"lazy dependencies imported at startup: {', '.join(eager)}")
+    if total > args.budget:
+        failures.append(f"import time {total:.2f}s exceeds budget {args.budget:.2f}s")
+    
+    print(f"\nimport main: {total:.2f}s (budget {args.budget:.2f}s)")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
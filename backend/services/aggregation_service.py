@@ -1,20 +1,42 @@
-from typing import Dict, Optional
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
 from datetime import datetime
+import asyncio
 import logging
+import time
 
+from config import settings
 from services.coingecko_service import CoinGeckoService
 from services.defillama_service import DefiLlamaService
 from services.github_service import GitHubService
 from services.twitter_service import TwitterService
 from services.roma_service import ROMAService
+from services.analysis_cache import AnalysisCache, HIT
+from services.scoring_service import ScoringService
+from services.rate_limiter import request_deadline
 from models.schemas import (
     ProjectData, TokenMetrics, Tokenomics, SocialMetrics,
     TechnicalMetrics, TeamInfo, AnalysisResponse, Scores,
-    RiskFlags, InvestmentThesis
+    RiskFlags, InvestmentThesis, DefiMetrics
 )
 
 logger = logging.getLogger(__name__)
 
+# Callback receiving (section name, section data) as results arrive
+Emitter = Callable[[str, Any], Awaitable[None]]
+
+# Schema used to shape each streamed section; only these and STREAMED_TEXT are streamed
+SECTION_MODELS = {
+    "token_metrics": TokenMetrics,
+    "tokenomics": Tokenomics,
+    "tvl": DefiMetrics,
+    "github": TechnicalMetrics,
+    "social": SocialMetrics,
+    "scores": Scores,
+    "risk_flags": RiskFlags,
+    "investment_thesis": InvestmentThesis,
+}
+STREAMED_TEXT = {"executive_summary"}
+
 class AggregationService:
     """Main service to aggregate data from all sources and perform AI analysis"""
     
@@ -24,14 +46,192 @@ class AggregationService:
         self.github = GitHubService()
         self.twitter = TwitterService()
         self.roma = ROMAService()
+        self.analysis_cache = AnalysisCache()
+        self.scoring = ScoringService()
+    
+    async def get_analysis(self, project_input: str, input_type: Optional[str] = None) -> Tuple[AnalysisResponse, str, float]:
+        """
+        Cached analysis (stale-while-revalidate)
+        
+        Returns (analysis, cache status, age in seconds)
+        """
+        if not input_type:
+            input_type = self._detect_input_type(project_input)
+        
+        key, coin_id = await self.resolve_identity(project_input, input_type)
+        return await self.analysis_cache.get(
+            key,
+            lambda: self.analyze_project(project_input, input_type, coin_id=coin_id)
+        )
+    
+    async def stream_analysis(self, project_input: str, input_type: Optional[str], emit: Emitter) -> Tuple[AnalysisResponse, str]:
+        """
+        Cached analysis that reports each section through `emit` as soon as it is ready
+        
+        On a cache hit (or when another request is already refreshing this project)
+        the sections are replayed from the finished analysis.
+        Returns (analysis, cache status)
+        """
+        if not input_type:
+            input_type = self._detect_input_type(project_input)
+        
+        streamed = set()
+        closed = False
+        
+        async def tracking_emit(event: str, data: Any):
+            # A stale refresh may outlive this stream; stop forwarding once it is done
+            if not closed:
+                streamed.add(event)
+                await emit(event, data)
+        
+        key, coin_id = await self.resolve_identity(project_input, input_type)
+        try:
+            analysis, cache_status, _ = await self.analysis_cache.get(
+                key,
+                lambda: self.analyze_project(project_input, input_type, emit=tracking_emit, coin_id=coin_id)
+            )
+            
+            if not streamed:
+                project_data = analysis.project_data
+                await emit("token_metrics", project_data.token_metrics.dict())
+                await emit("tokenomics", project_data.tokenomics.dict())
+                await emit("tvl", project_data.defi_metrics.dict())
+                await emit("github", project_data.technical_metrics.dict())
+                await emit("social", project_data.social_metrics.dict())
+                await emit("executive_summary", analysis.executive_summary)
+                await emit("scores", analysis.scores.dict())
+                await emit("risk_flags", analysis.risk_flags.dict())
+                await emit("investment_thesis", analysis.investment_thesis.dict())
+        finally:
+            closed = True
+        
+        return analysis, cache_status
+    
+    async def warm_analysis(self, project_input: str, input_type: Optional[str] = None,
+                            margin: float = 0) -> AnalysisResponse:
+        """
+        Make sure the analysis cache holds a fresh analysis for a project
+        
+        Entries still fresh `margin` seconds from now are left alone; otherwise the
+        analysis is re-run (sharing any refresh already in flight) so the next
+        /analyze is served warm.
+        """
+        if not input_type:
+            input_type = self._detect_input_type(project_input)
+        
+        key, coin_id = await self.resolve_identity(project_input, input_type)
+        cached = self.analysis_cache.peek(key)
+        if cached and cached[1] + margin < settings.ANALYSIS_CACHE_FRESH:
+            return cached[0]
+        
+        return await asyncio.shield(self.analysis_cache.refresh(
+            key,
+            lambda: self.analyze_project(project_input, input_type, coin_id=coin_id)
+        ))
+    
+    async def analyze_batch(self, project_inputs: List[str], concurrency: Optional[int] = None) -> AsyncIterator[Dict]:
+        """
+        Analyze many projects, yielding one result per project as it finishes
+        
+        Project names and contract addresses are resolved to coin ids first and
+        their market data fetched in bulk (one /coins/markets call per 250 coins)
+        to seed each analysis; the DefiLlama catalogue is loaded once up front. At most `concurrency`
+        analyses run at once, each through the analysis cache. A failing project
+        yields an error result and does not affect the others.
+        """
+        semaphore = asyncio.Semaphore(concurrency or settings.BATCH_CONCURRENCY)
+        input_types = [self._detect_input_type(project_input) for project_input in project_inputs]
+        
+        async def resolve(project_input: str, input_type: str) -> Optional[str]:
+            async with semaphore:
+                if input_type == "contract_address":
+                    contract = await self._resolve_contract(project_input)
+                    return contract[0] if contract else None
+                if input_type == "project_name":
+                    return await self.coingecko.search_coin(project_input.strip().lower())
+                return None
+        
+        catalogue = self.defillama.warm_catalogue() if not len(self.defillama.catalogue) else None
+        coin_ids = await asyncio.gather(*(resolve(p, t) for p, t in zip(project_inputs, input_types)))
+        markets = await self.coingecko.get_markets([coin_id for coin_id in coin_ids if coin_id])
+        if catalogue is not None:
+            await asyncio.shield(catalogue)
+        
+        async def run(index: int) -> Dict:
+            project_input, input_type, coin_id = project_inputs[index], input_types[index], coin_ids[index]
+            result = {"index": index, "input": project_input}
+            async with semaphore:
+                try:
+                    full = self.analysis_cache.peek(f"coin:{coin_id}") if coin_id else None
+                    if full and full[1] < settings.ANALYSIS_CACHE_FRESH:
+                        # A fresh full analysis beats a seeded one
+                        analysis, cache_status = full[0], HIT
+                    else:
+                        if coin_id:
+                            # Seeded analyses lack the coin document (website, description):
+                            # keep them out of the entries /analyze serves
+                            key = f"batch:coin:{coin_id}" if coin_id in markets else f"coin:{coin_id}"
+                        else:
+                            key = await self.canonical_key(project_input, input_type)
+                        analysis, cache_status, _ = await self.analysis_cache.get(
+                            key,
+                            lambda: self.analyze_project(
+                                project_input, input_type, coin_id=coin_id, market=markets.get(coin_id)
+                            )
+                        )
+                except Exception as e:
+                    logger.error(f"Batch analysis failed for {project_input}: {e}")
+                    return {**result, "status": "error", "error": str(e)}
+            return {**result, "status": "ok", "cache_status": cache_status, "analysis": analysis.dict()}
+        
+        tasks = [asyncio.ensure_future(run(index)) for index in range(len(project_inputs))]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+        finally:
+            # Consumer went away: stop the remaining analyses (cache refreshes keep running)
+            for task in tasks:
+                task.cancel()
+    
+    async def canonical_key(self, project_input: str, input_type: str) -> str:
+        """Canonical project identity, so "ETH", "ethereum" and "Ethereum" share one entry"""
+        key, _ = await self.resolve_identity(project_input, input_type)
+        return key
     
-    async def analyze_project(self, project_input: str, input_type: Optional[str] = None) -> AnalysisResponse:
+    async def resolve_identity(self, project_input: str, input_type: str) -> Tuple[str, Optional[str]]:
+        """
+        (canonical cache key, CoinGecko coin id or None)
+        
+        The coin id seeds the analysis, so every alias sharing a key is analyzed
+        as the same coin rather than as whichever spelling arrived first.
+        """
+        value = project_input.strip().lower()
+        
+        if input_type == "twitter_handle":
+            return f"twitter:{value.lstrip('@')}", None
+        if input_type == "coin_id":
+            # Picked from /search suggestions: the coin is already known
+            return f"coin:{value}", value
+        if input_type == "contract_address":
+            # Known addresses share the coin's entry; no network call for the key
+            contract = self.coingecko.contracts.lookup(value)
+            return (f"coin:{contract[0]}", contract[0]) if contract else (f"contract:{value}", None)
+        
+        # Bounded like a source: a cold /search must not hold the analysis back
+        coin_id = await self._within_budget("search", self.coingecko.search_coin(value))
+        return (f"coin:{coin_id}", coin_id) if coin_id else (f"name:{value}", None)
+    
+    async def analyze_project(self, project_input: str, input_type: Optional[str] = None, emit: Optional[Emitter] = None,
+                              coin_id: Optional[str] = None, market: Optional[Dict] = None) -> AnalysisResponse:
         """
         Main analysis pipeline
         1. Detect input type if not provided
         2. Aggregate data from all sources
         3. Run AI analysis using ROMA
         4. Return comprehensive analysis
+        
+        If `emit` is given, each section is reported as soon as it is available.
+        `coin_id` and `market` seed the CoinGecko context with data fetched in bulk.
         """
         logger.info(f"Starting analysis for: {project_input}")
         
@@ -40,18 +240,17 @@ class AggregationService:
             input_type = self._detect_input_type(project_input)
         
         # Step 2: Aggregate all data
-        project_data = await self._aggregate_project_data(project_input, input_type)
+        project_data = await self._aggregate_project_data(project_input, input_type, emit, coin_id, market)
         
         # Step 3: AI Analysis using ROMA
-        executive_summary = await self.roma.generate_executive_summary(project_data.dict())
-        scores_dict = await self.roma.calculate_scores(project_data.dict())
-        risk_data = await self.roma.analyze_risk_flags(project_data.dict())
-        thesis_data = await self.roma.generate_investment_thesis(project_data.dict(), scores_dict)
+        section_emit = (lambda name, data: self._emit(emit, name, data)) if emit else None
+        sections = await self.roma.analyze_project(project_data.dict(), emit=section_emit)
         
         # Build response
-        scores = Scores(**scores_dict)
-        risk_flags = RiskFlags(**risk_data)
-        investment_thesis = InvestmentThesis(**thesis_data)
+        executive_summary = sections["executive_summary"]
+        scores = Scores(**sections["scores"])
+        risk_flags = RiskFlags(**sections["risk_flags"])
+        investment_thesis = InvestmentThesis(**sections["investment_thesis"])
         
         return AnalysisResponse(
             project_data=project_data,
@@ -77,7 +276,8 @@ class AggregationService:
         # Default to project name
         return "project_name"
     
-    async def _aggregate_project_data(self, project_input: str, input_type: str) -> ProjectData:
+    async def _aggregate_project_data(self, project_input: str, input_type: str, emit: Optional[Emitter] = None,
+                                      coin_id: Optional[str] = None, market: Optional[Dict] = None) -> ProjectData:
         """Aggregate data from all sources"""
         
         # Initialize with default values
@@ -85,89 +285,204 @@ class AggregationService:
         contract_address = None
         twitter_handle = None
         
+        # Twitter is collected in one pass; a handle input also names the project
+        social_fetch = None
+        prefetch_late = []
+        
         # Resolve based on input type
         if input_type == "twitter_handle":
             twitter_handle = project_input
-            # Try to find project name from Twitter bio
-            user_data = await self.twitter.get_user_by_username(twitter_handle)
-            if user_data:
-                # Extract project name from username or description
-                project_name = user_data.username
+            # The handle names the project, so Twitter runs first, under the social budget
+            social_data = await self._within_budget(
+                "social", self.twitter.get_social_metrics(twitter_handle.lstrip("@"), twitter_handle), late=prefetch_late
+            ) or {}
+            if social_data.get("username"):
+                # Extract project name from username
+                project_name = social_data["username"]
+            social_fetch = self._resolved(social_data)
         
         elif input_type == "contract_address":
             contract_address = project_input
-            # Try to find project name from CoinGecko
-            # This is simplified - in production, use blockchain explorer
-            project_name = "Unknown Project"
+            # Resolve the token from the local contract index (per-contract lookup on a miss)
+            contract = await self._resolve_contract(contract_address)
+            if contract:
+                coin_id, project_name = coin_id or contract[0], contract[1]
+        
+        elif coin_id:
+            # Aliases ("ETH", "eth", "Ethereum") share one cached analysis: run it under the coin's own name
+            project_name = (
+                (market or {}).get("name")
+                or await self._within_budget("coin_name", self.coingecko.coin_name(coin_id))
+                or project_input
+            )
         
         # Fetch data from all sources in parallel
         logger.info(f"Fetching data for project: {project_name}")
         
-        # CoinGecko data
-        token_metrics_data = await self.coingecko.get_token_metrics(project_name)
-        tokenomics_data = await self.coingecko.get_tokenomics(project_name)
-        
-        # DefiLlama data
-        tvl_data = await self.defillama.get_tvl_data(project_name)
+        # One CoinGecko resolution shared by every extractor in this analysis
+        coin_context = self.coingecko.context(project_name, coin_id, market)
         
-        # GitHub data
-        technical_data = await self.github.get_technical_metrics(project_name)
-        
-        # Twitter data
-        social_data = await self.twitter.get_social_metrics(project_name, twitter_handle)
-        sentiment = await self.twitter.get_sentiment_score(project_name)
-        social_data["sentiment_score"] = sentiment
+        sources = await self._fan_out({
+            "token_metrics": self.coingecko.get_token_metrics(project_name, coin_context),
+            "tokenomics": self.coingecko.get_tokenomics(project_name, coin_context),
+            "coin_info": self.coingecko.get_coin_info(project_name, coin_context),
+            "tvl": self.defillama.get_tvl_data(project_name),
+            "github": self.github.get_technical_metrics(project_name),
+            "social": social_fetch or self.twitter.get_social_metrics(project_name, twitter_handle),
+        }, emit=emit)
+        results = sources["results"]
+        for name in prefetch_late:
+            # Fetched before the fan-out and over budget there: late, not missing
+            sources["missing"].remove(name)
+            sources["late"].append(name)
         
         # Build structured data
-        token_metrics = TokenMetrics(**token_metrics_data)
-        tokenomics = Tokenomics(**tokenomics_data)
-        social_metrics = SocialMetrics(**social_data)
-        technical_metrics = TechnicalMetrics(**technical_data)
+        token_metrics = TokenMetrics(**results["token_metrics"])
+        tokenomics = Tokenomics(**results["tokenomics"])
+        social_metrics = SocialMetrics(**results["social"])
+        technical_metrics = TechnicalMetrics(**results["github"])
+        defi_metrics = DefiMetrics(**results["tvl"])
         team_info = TeamInfo()  # Would need LinkedIn API or manual data
         
-        # Get additional info from CoinGecko
-        coin_id = await self.coingecko.search_coin(project_name)
-        coin_data = await self.coingecko.get_coin_data(coin_id) if coin_id else None
-        
-        website = None
-        description = None
-        symbol = None
-        
-        if coin_data:
-            website = coin_data.get("links", {}).get("homepage", [None])[0]
-            description = coin_data.get("description", {}).get("en", "")
-            symbol = coin_data.get("symbol", "").upper()
-            if not contract_address:
-                contract_address = await self.coingecko.get_contract_address(coin_id)
+        coin_info = results["coin_info"]
         
         return ProjectData(
             project_name=project_name,
-            symbol=symbol,
-            contract_address=contract_address,
-            website=website,
-            description=description,
+            symbol=coin_info.get("symbol"),
+            contract_address=contract_address or coin_info.get("contract_address"),
+            website=coin_info.get("website"),
+            description=coin_info.get("description"),
             token_metrics=token_metrics,
             tokenomics=tokenomics,
             social_metrics=social_metrics,
             technical_metrics=technical_metrics,
-            team_info=team_info
+            defi_metrics=defi_metrics,
+            team_info=team_info,
+            late_sources=sources["late"],
+            missing_sources=sources["missing"]
         )
     
+    async def quick_score(self, project_name: str) -> Dict:
+        """
+        Lightweight, LLM-free score
+        
+        Fetches only market and repository data and scores it with the
+        deterministic ScoringService.
+        """
+        coin_context = self.coingecko.context(project_name)
+        sources = await self._fan_out({
+            "token_metrics": self.coingecko.get_token_metrics(project_name, coin_context),
+            "tokenomics": self.coingecko.get_tokenomics(project_name, coin_context),
+            "github": self.github.get_technical_metrics(project_name),
+        }, deadline=settings.QUICK_SCORE_DEADLINE)
+        results = sources["results"]
+        
+        project_data = {
+            "project_name": project_name,
+            "token_metrics": results["token_metrics"],
+            "tokenomics": results["tokenomics"],
+            "technical_metrics": results["github"],
+        }
+        scores = self.scoring.calculate_scores(project_data)
+        risk = self.scoring.analyze_risk_flags(project_data)
+        
+        return {
+            "project_name": project_name,
+            "total_score": scores["total"],
+            "risk_level": risk["level"],
+            "price": results["token_metrics"].get("price"),
+            "market_cap": results["token_metrics"].get("market_cap"),
+            "late_sources": sources["late"],
+            "missing_sources": sources["missing"],
+        }
+    
+    async def _fan_out(self, fetchers: Dict[str, Awaitable], deadline: Optional[float] = None, emit: Optional[Emitter] = None) -> Dict:
+        """
+        Run every source concurrently under per-source timeouts and a request-wide deadline.
+        A source that is late or fails yields an empty section and is reported instead of
+        holding the response back. Non-empty sections are passed to `emit` as they finish,
+        empty ones when the fan-out ends.
+        """
+        async def run(name: str, fetcher: Awaitable):
+            timeout = settings.source_timeout(name)
+            # Never queue for a rate-limit token this source would be cancelled before using
+            request_deadline.set(min(request_deadline.get(), time.time() + timeout))
+            result = await asyncio.wait_for(fetcher, timeout)
+            if result:
+                await self._emit(emit, name, result)
+            return result
+        
+        deadline = deadline or settings.ANALYSIS_DEADLINE
+        
+        # Upstream rate limiting rejects waits that would overrun this deadline;
+        # tasks copy the context when created, so it is scoped to the fan-out
+        token = request_deadline.set(time.time() + deadline)
+        tasks = {
+            name: asyncio.ensure_future(run(name, fetcher))
+            for name, fetcher in fetchers.items()
+        }
+        request_deadline.reset(token)
+        _, pending = await asyncio.wait(tasks.values(), timeout=deadline)
+        for task in pending:
+            task.cancel()
+        
+        results, late, missing = {}, [], []
+        for name, task in tasks.items():
+            results[name] = {}
+            if task in pending:
+                late.append(name)
+            elif task.cancelled() or isinstance(task.exception(), asyncio.TimeoutError):
+                late.append(name)
+            elif task.exception() is not None:
+                logger.error(f"Source {name} failed: {task.exception()}")
+                missing.append(name)
+            elif not task.result():
+                missing.append(name)
+            else:
+                results[name] = task.result()
+        
+        if late:
+            logger.warning(f"Sources over budget: {', '.join(late)}")
+        
+        # Late, failed and empty sections were not streamed; send them empty so
+        # every section event arrives exactly once, as on a cache replay
+        for name in late + missing:
+            await self._emit(emit, name, {})
+        
+        return {"results": results, "late": late, "missing": missing}
+    
     async def compare_projects(self, project_names: list) -> Dict:
-        """Compare multiple projects side-by-side"""
-        analyses = []
+        """
+        Compare multiple projects side-by-side
         
-        for project_name in project_names:
-            try:
-                analysis = await self.analyze_project(project_name)
-                analyses.append(analysis)
-            except Exception as e:
-                logger.error(f"Error analyzing {project_name}: {e}")
+        The projects are analyzed concurrently through the analysis cache. Projects
+        whose analysis failed are listed in `missing_projects`, those analyzed with
+        late or missing sources in `degraded_projects`.
+        """
+        results = await asyncio.gather(
+            *(self.get_analysis(project_name) for project_name in project_names),
+            return_exceptions=True
+        )
         
-        # Generate comparative summary using ROMA
-        comparison_prompt = f"Compare these {len(analyses)} crypto projects and provide key differences:"
-        for analysis in analyses:
-            comparison_prompt += f"\n- {analysis.project_data.project_name}: Score {analysis.scores.total}/50"
+        analyses = []
+        missing_projects = []
+        degraded_projects = []
+        for project_name, result in zip(project_names, results):
+            if isinstance(result, BaseException):
+                logger.error(f"Error analyzing {project_name}: {result}")
+                missing_projects.append(project_name)
+                continue
+            analysis = result[0]
+            analyses.append(analysis)
+            if analysis.project_data.late_sources or analysis.project_data.missing_sources:
+                degraded_projects.append(analysis.project_data.project_name)
+        
+        # Generate comparative summary using ROMA; the prompt depends only on the
+        # set of projects and their scores, so repeated comparisons hit the completion cache
+        snapshot = sorted((analysis.project_data.project_name, analysis.scores.total) for analysis in analyses)
+        comparison_prompt = f"Compare these {len(snapshot)} crypto projects and provide key differences:"
+        for project_name, score in snapshot:
+            comparison_prompt += f"\n- {project_name}: Score {score}/50"
         
         try:
             comparative_summary = await self.roma._call_ai(comparison_prompt, max_tokens=300)
@@ -176,5 +491,48 @@ class AggregationService:
         
         return {
             "projects": analyses,
-            "comparative_summary": comparative_summary
+            "comparative_summary": comparative_summary,
+            "degraded_projects": degraded_projects,
+            "missing_projects": missing_projects
         }
+    
+    async def _resolve_contract(self, address: str) -> Optional[Tuple[str, str]]:
+        """(coin id, coin name) for a contract address; None if unresolved within CONTRACT_TIMEOUT"""
+        return await self._within_budget("contract", self.coingecko.resolve_contract(address))
+    
+    async def _within_budget(self, source: str, fetcher: Awaitable, late: Optional[List[str]] = None) -> Any:
+        """
+        Await a lookup that runs before the fan-out under its own source budget
+        
+        Rate-limit waits are bounded by the same budget (<SOURCE>_TIMEOUT, else
+        SOURCE_TIMEOUT); a lookup that fails or runs over yields None. Sources
+        over budget are appended to `late` when given.
+        """
+        timeout = settings.source_timeout(source)
+        token = request_deadline.set(time.time() + timeout)
+        try:
+            return await asyncio.wait_for(fetcher, timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"{source} lookup over budget")
+            if late is not None:
+                late.append(source)
+            return None
+        except Exception as e:
+            logger.error(f"{source} lookup failed: {e}")
+            return None
+        finally:
+            request_deadline.reset(token)
+    
+    async def _resolved(self, value: Any) -> Any:
+        """Wrap an already-fetched value as a fan-out source"""
+        return value
+    
+    async def _emit(self, emit: Optional[Emitter], event: str, data: Any):
+        """Shape a documented section with its schema and pass it to `emit`; never fails the pipeline"""
+        if emit is None or (event not in SECTION_MODELS and event not in STREAMED_TEXT):
+            return
+        try:
+            model = SECTION_MODELS.get(event)
+            await emit(event, model(**data).dict() if model else data)
+        except Exception as e:
+            logger.error(f"Error emitting {event}: {e}")
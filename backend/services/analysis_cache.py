@@ -0,0 +1,72 @@
+from cachetools import LRUCache
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from config import settings
+from models.schemas import AnalysisResponse
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Cache statuses reported to clients
+HIT = "HIT"
+STALE = "STALE"
+MISS = "MISS"
+
+
+class AnalysisCache:
+    """
+    Stale-while-revalidate cache for full AnalysisResponse objects.
+    
+    Fresh entries are served as-is, stale entries are served immediately while a
+    background refresh runs, and only a cold miss waits for the pipeline.
+    Concurrent refreshes of the same key share one in-flight task.
+    """
+    
+    def __init__(self, max_entries: Optional[int] = None):
+        self._entries = LRUCache(maxsize=max_entries or settings.ANALYSIS_CACHE_MAX_ENTRIES)
+        self._inflight: Dict[str, asyncio.Task] = {}
+    
+    def peek(self, key: str) -> Optional[Tuple[AnalysisResponse, float]]:
+        """Return (analysis, age) without triggering a refresh"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, analysis = entry
+        return analysis, time.time() - stored_at
+    
+    def refresh(self, key: str, loader: Callable[[], Awaitable[AnalysisResponse]]) -> asyncio.Task:
+        """Run the loader for `key` unless a refresh is already in flight"""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._load(key, loader))
+            task.add_done_callback(self._log_refresh_error)
+            self._inflight[key] = task
+        return task
+    
+    async def _load(self, key: str, loader: Callable[[], Awaitable[AnalysisResponse]]) -> AnalysisResponse:
+        try:
+            analysis = await loader()
+            self._entries[key] = (time.time(), analysis)
+            return analysis
+        finally:
+            self._inflight.pop(key, None)
+    
+    async def get(self, key: str, loader: Callable[[], Awaitable[AnalysisResponse]]) -> Tuple[AnalysisResponse, str, float]:
+        """Return (analysis, cache status, age in seconds)"""
+        cached = self.peek(key)
+        if cached:
+            analysis, age = cached
+            if age < settings.ANALYSIS_CACHE_FRESH:
+                return analysis, HIT, age
+            if age < settings.ANALYSIS_CACHE_FRESH + settings.ANALYSIS_CACHE_STALE:
+                self.refresh(key, loader)
+                return analysis, STALE, age
+        
+        # Shield so a disconnecting client does not cancel a refresh others may share
+        analysis = await asyncio.shield(self.refresh(key, loader))
+        return analysis, MISS, 0.0
+    
+    def _log_refresh_error(self, task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Analysis refresh failed: {task.exception()}")
@@ -0,0 +1,162 @@
+from cachetools import LRUCache
+from typing import Any, Callable, Dict, Optional, Tuple
+from config import settings
+import asyncio
+import functools
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class TieredCache:
+    """
+    Two-tier TTL cache for upstream responses.
+    
+    A bounded in-process LRU sits in front of an on-disk SQLite store (WAL mode)
+    that survives restarts and is shared by every worker on the host. Each kind
+    of data has its own TTL (see settings.CACHE_TTLS).
+    """
+    
+    def __init__(self, db_path: Optional[str] = None, max_entries: Optional[int] = None):
+        self.db_path = db_path or os.path.join(settings.CACHE_DIR, "upstream.db")
+        self._memory = LRUCache(maxsize=max_entries or settings.CACHE_MAX_ENTRIES)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.stats: Dict[str, Dict[str, int]] = {}
+    
+    def ttl(self, kind: str) -> int:
+        return settings.CACHE_TTLS.get(kind, settings.CACHE_TTL)
+    
+    def _count(self, kind: str, counter: str):
+        kind_stats = self.stats.setdefault(kind, {"memory_hits": 0, "disk_hits": 0, "misses": 0})
+        kind_stats[counter] += 1
+    
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, kind TEXT, expires_at REAL, value TEXT)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_kind_expiry ON cache (kind, expires_at)")
+            self._conn = conn
+        return self._conn
+    
+    def _disk_get(self, key: str) -> Optional[Tuple[float, Any]]:
+        with self._lock:
+            row = self._db().execute(
+                "SELECT expires_at, value FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row and row[0] > time.time():
+            return row[0], json.loads(row[1])
+        return None
+    
+    def _disk_set(self, key: str, kind: str, expires_at: float, value: Any):
+        payload = json.dumps(value, default=str)
+        with self._lock:
+            db = self._db()
+            db.execute(
+                "INSERT OR REPLACE INTO cache (key, kind, expires_at, value) VALUES (?, ?, ?, ?)",
+                (key, kind, expires_at, payload)
+            )
+            self._writes += 1
+            if self._writes % 500 == 0:
+                db.execute("DELETE FROM cache WHERE expires_at < ?", (time.time(),))
+            if self._writes % 100 == 0:
+                self._enforce_disk_limits(db)
+            db.commit()
+    
+    def _enforce_disk_limits(self, db: sqlite3.Connection):
+        """Evict the soonest-expiring rows of kinds that exceed their row cap"""
+        for kind, limit in settings.CACHE_DISK_LIMITS.items():
+            db.execute(
+                "DELETE FROM cache WHERE kind = ? AND key NOT IN ("
+                "SELECT key FROM cache WHERE kind = ? ORDER BY expires_at DESC LIMIT ?)",
+                (kind, kind, limit)
+            )
+    
+    async def get(self, kind: str, key: str, memory: bool = True) -> Tuple[bool, Any]:
+        """Return (hit, value), checking memory first and then disk"""
+        if memory:
+            entry = self._memory.get(key)
+            if entry and entry[0] > time.time():
+                self._count(kind, "memory_hits")
+                return True, entry[1]
+        
+        try:
+            entry = await asyncio.to_thread(self._disk_get, key)
+        except Exception as e:
+            logger.error(f"Cache read failed: {e}")
+            entry = None
+        
+        if entry:
+            self._count(kind, "disk_hits")
+            if memory:
+                self._memory[key] = entry
+            return True, entry[1]
+        
+        self._count(kind, "misses")
+        return False, None
+    
+    async def set(self, kind: str, key: str, value: Any, memory: bool = True):
+        """Store a value in both tiers with the TTL of its kind"""
+        expires_at = time.time() + self.ttl(kind)
+        if memory:
+            self._memory[key] = (expires_at, value)
+        try:
+            await asyncio.to_thread(self._disk_set, key, kind, expires_at, value)
+        except Exception as e:
+            logger.error(f"Cache write failed: {e}")
+    
+    def get_stats(self) -> Dict:
+        """Hit/miss counters per kind plus current memory usage"""
+        return {
+            "memory_entries": len(self._memory),
+            "memory_capacity": self._memory.maxsize,
+            "kinds": self.stats,
+        }
+    
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# Shared cache for all upstream services
+response_cache = TieredCache()
+
+
+def cached(kind: str, memory: bool = True) -> Callable:
+    """
+    Cache an async service method's result under `kind`.
+    
+    Empty results (None, {}, 0.0) are treated as failures and never cached.
+    Set memory=False for large payloads that should only live on disk.
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        async def wrapper(self, *args, **kwargs):
+            if not settings.CACHE_ENABLED:
+                return await func(self, *args, **kwargs)
+            
+            key = f"{kind}:{func.__qualname__}:{json.dumps([args, kwargs], default=str, sort_keys=True)}"
+            hit, value = await response_cache.get(kind, key, memory=memory)
+            if hit:
+                return value
+            
+            value = await func(self, *args, **kwargs)
+            if value:
+                await response_cache.set(kind, key, value, memory=memory)
+            return value
+        return wrapper
+    return decorator
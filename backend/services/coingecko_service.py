@@ -1,57 +1,509 @@
-import httpx
-from typing import Optional, Dict
+import asyncio
+import heapq
+from typing import Optional, Dict, List, Tuple
 from config import settings
+from services.http_client import HTTPClientPool, http_clients
+from services.cache_service import cached
+from services.rate_limiter import rate_limiter
+from services.search_index import PrefixIndex, normalize_name
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
+# Fields of a /coins/markets row (see CoinGeckoService._market_metrics) used by each extractor
+TOKEN_METRIC_FIELDS = ("price", "market_cap", "fully_diluted_valuation", "volume_24h", "price_change_24h", "price_change_7d")
+TOKENOMICS_FIELDS = ("total_supply", "circulating_supply", "max_supply")
+
+# Platforms tried, in order, when an address is not in the contract index
+CONTRACT_PLATFORMS = ("ethereum", "binance-smart-chain", "polygon-pos", "arbitrum-one", "base")
+
+
+class ContractIndex:
+    """
+    In-memory (platform, contract address) -> coin id index.
+    
+    Built from CoinGecko's /coins/list?include_platform=true and refreshed
+    incrementally: each reload only re-indexes coins whose platforms changed and
+    drops coins that disappeared. Addresses are stored lowercased; a lookup
+    without a platform prefers the Ethereum deployment.
+    """
+    
+    def __init__(self):
+        self._contracts: Dict[str, Dict[str, str]] = {}  # address -> {platform: coin id}
+        self._platforms: Dict[str, Dict[str, str]] = {}  # coin id -> {platform: address}
+        self._names: Dict[str, str] = {}
+    
+    def __len__(self) -> int:
+        return len(self._contracts)
+    
+    def load(self, coins: List[Dict]) -> int:
+        """Apply a /coins/list payload; returns the number of coins (re)indexed or removed"""
+        current = {}
+        for coin in coins:
+            platforms = {
+                platform: address.lower()
+                for platform, address in (coin.get("platforms") or {}).items()
+                if platform and address
+            }
+            if coin.get("id") and platforms:
+                current[coin["id"]] = platforms
+                self._names[coin["id"]] = coin.get("name") or coin["id"]
+        
+        changed = 0
+        for coin_id in self._platforms.keys() - current.keys():
+            self._unindex(coin_id, self._platforms.pop(coin_id))
+            self._names.pop(coin_id, None)
+            changed += 1
+        for coin_id, platforms in current.items():
+            previous = self._platforms.get(coin_id)
+            if previous == platforms:
+                continue
+            if previous:
+                self._unindex(coin_id, previous)
+            self._index(coin_id, platforms)
+            changed += 1
+        return changed
+    
+    def add(self, coin_id: str, name: Optional[str], platform: str, address: str):
+        """Record a single contract resolved outside the coin list"""
+        platforms = {**self._platforms.get(coin_id, {}), platform: address.lower()}
+        self._names[coin_id] = name or self._names.get(coin_id) or coin_id
+        self._index(coin_id, platforms)
+    
+    def name(self, coin_id: str) -> Optional[str]:
+        return self._names.get(coin_id)
+    
+    def address(self, coin_id: Optional[str]) -> Optional[str]:
+        """A coin's contract address, preferring its Ethereum deployment"""
+        platforms = self._platforms.get(coin_id) or {}
+        return platforms.get("ethereum") or next(iter(platforms.values()), None)
+    
+    def lookup(self, address: str, platform: Optional[str] = None) -> Optional[Tuple[str, str]]:
+        """(coin id, coin name) for a contract address"""
+        deployments = self._contracts.get(address.strip().lower())
+        if not deployments:
+            return None
+        if platform:
+            coin_id = deployments.get(platform)
+        else:
+            coin_id = deployments.get("ethereum") or next(iter(deployments.values()))
+        return (coin_id, self._names.get(coin_id, coin_id)) if coin_id else None
+    
+    def _index(self, coin_id: str, platforms: Dict[str, str]):
+        self._platforms[coin_id] = platforms
+        for platform, address in platforms.items():
+            self._contracts.setdefault(address, {})[platform] = coin_id
+    
+    def _unindex(self, coin_id: str, platforms: Dict[str, str]):
+        for platform, address in platforms.items():
+            deployments = self._contracts.get(address)
+            if deployments and deployments.get(platform) == coin_id:
+                del deployments[platform]
+                if not deployments:
+                    del self._contracts[address]
+
+
+class CoinSearchIndex:
+    """
+    In-memory search over CoinGecko's coin list (ids, names and symbols).
+    
+    Entries are parallel arrays ordered by market-cap rank, unranked coins
+    last, so a smaller position is a better match. Suggestions list exact,
+    then prefix, then name-substring matches. Resolution is stricter: a query
+    is answered locally only when its best match is ranked or the only coin
+    with that key, and never by symbol alone while ranks are unavailable.
+    Anything else is left to CoinGecko's /search.
+    """
+    
+    def __init__(self):
+        self._ids: List[str] = []
+        self._names: List[str] = []
+        self._symbols: List[str] = []
+        self._ranks: List[Optional[int]] = []
+        self._positions: Dict[str, int] = {}
+        self._exact: Dict[str, int] = {}
+        self._ambiguous: set = set()  # keys shared by several coins
+        self._symbol_only: set = set()  # keys whose best coin matches by symbol only
+        self._prefix = PrefixIndex()
+        self._name_keys: List[str] = []
+        self.ranked = False
+    
+    def __len__(self) -> int:
+        return len(self._ids)
+    
+    def load(self, coins: List[Dict], ranks: Dict[str, int]):
+        """Rebuild the arrays and indexes from a /coins/list payload and market-cap ranks"""
+        unranked = float("inf")
+        coins = sorted(
+            (coin for coin in coins if coin.get("id")),
+            key=lambda coin: ranks.get(coin["id"]) or unranked
+        )
+        ids = [coin["id"] for coin in coins]
+        names = [coin.get("name") or coin["id"] for coin in coins]
+        symbols = [(coin.get("symbol") or "").upper() for coin in coins]
+        name_keys = [normalize_name(name) for name in names]
+        
+        exact: Dict[str, int] = {}
+        ambiguous, by_name, pairs = set(), set(), []
+        for idx, (coin_id, name_key, symbol) in enumerate(zip(ids, name_keys, symbols)):
+            id_key, symbol_key = normalize_name(coin_id), normalize_name(symbol)
+            for key in {id_key, name_key, symbol_key} - {""}:
+                pairs.append((key, idx))
+                # Positions are in rank order: the first coin to claim a key is the best
+                best = exact.setdefault(key, idx)
+                if best != idx:
+                    ambiguous.add(key)
+                elif key in (id_key, name_key):
+                    by_name.add(key)
+        
+        # Swap in the new indexes in one step so readers never see a partial build
+        self._ids = ids
+        self._names = names
+        self._symbols = symbols
+        self._ranks = [ranks.get(coin_id) for coin_id in ids]
+        self._positions = {coin_id: idx for idx, coin_id in enumerate(ids)}
+        self._exact = exact
+        self._ambiguous = ambiguous
+        self._symbol_only = exact.keys() - by_name
+        self._prefix = PrefixIndex(pairs)
+        self._name_keys = name_keys
+        self.ranked = bool(ranks)
+    
+    def resolve(self, query: str) -> Optional[str]:
+        """Coin id for an exact id, name or symbol match, or None when a local answer could be wrong"""
+        key = normalize_name(query)
+        idx = self._exact.get(key)
+        if idx is None:
+            return None
+        if self._ranks[idx] is not None:
+            return self._ids[idx]
+        if key in self._ambiguous or (key in self._symbol_only and not self.ranked):
+            return None
+        return self._ids[idx]
+    
+    def name(self, coin_id: str) -> Optional[str]:
+        idx = self._positions.get(coin_id)
+        return self._names[idx] if idx is not None else None
+    
+    def suggest(self, query: str, limit: int = 10) -> List[Dict]:
+        """Up to `limit` coins matching `query`: exact, then prefix, then substring matches"""
+        key = normalize_name(query)
+        if not key or not self._ids:
+            return []
+        
+        matches: List[int] = []
+        exact = self._exact.get(key)
+        if exact is not None:
+            matches.append(exact)
+        
+        # Prefix matches on any field, best ranked first
+        for idx in heapq.nsmallest(limit + 1, set(self._prefix.matching(key))):
+            if idx != exact:
+                matches.append(idx)
+        
+        # Names containing the query, for the remaining slots
+        if len(matches) < limit and len(key) >= 3:
+            seen = set(matches)
+            for idx, name in enumerate(self._name_keys):
+                if key in name and idx not in seen:
+                    matches.append(idx)
+                    if len(matches) >= limit:
+                        break
+        
+        return [self._entry(idx) for idx in matches[:limit]]
+    
+    def _entry(self, idx: int) -> Dict:
+        return {
+            "id": self._ids[idx],
+            "name": self._names[idx],
+            "symbol": self._symbols[idx],
+            "market_cap_rank": self._ranks[idx],
+        }
+
+
+class CoinCatalogue:
+    """
+    CoinGecko's coin list as a contract index and a search index, plus the
+    refresh bookkeeping shared by both.
+    
+    A failed or partial (unranked) refresh is retried with exponential backoff
+    instead of on every lookup.
+    """
+    
+    RETRY_BASE_SECONDS = 30
+    RETRY_MAX_SECONDS = 900
+    
+    def __init__(self):
+        self.contracts = ContractIndex()
+        self.search = CoinSearchIndex()
+        self.loaded_at: float = 0.0
+        self.failures = 0
+        self.retry_at: float = 0.0
+        self._refresh_task: Optional[asyncio.Task] = None
+    
+    @property
+    def is_stale(self) -> bool:
+        return not self.loaded_at or time.monotonic() - self.loaded_at > settings.COINGECKO_COIN_LIST_TTL
+    
+    @property
+    def refresh_due(self) -> bool:
+        return self.is_stale and time.monotonic() >= self.retry_at
+    
+    def mark_loaded(self):
+        self.loaded_at = time.monotonic()
+        self.failures = 0
+        self.retry_at = 0.0
+    
+    def mark_failed(self):
+        delay = min(self.RETRY_MAX_SECONDS, self.RETRY_BASE_SECONDS * 2 ** self.failures)
+        self.failures += 1
+        self.retry_at = time.monotonic() + delay
+
+
+# Shared across service instances so the coin list is downloaded once per worker
+coin_catalogue = CoinCatalogue()
+
+
 class CoinGeckoService:
     BASE_URL = "https://api.coingecko.com/api/v3"
+    MARKETS_PAGE_SIZE = 250  # max ids per /coins/markets call
     
-    def __init__(self):
+    def __init__(self, http: Optional[HTTPClientPool] = None, catalogue: Optional[CoinCatalogue] = None):
         self.api_key = settings.COINGECKO_API_KEY
-        
+        self.http = http or http_clients
+        self.catalogue = catalogue or coin_catalogue
+        self.contracts = self.catalogue.contracts
+        self.search_index = self.catalogue.search
+    
     async def search_coin(self, query: str) -> Optional[str]:
-        """Search for a coin by name and return its ID"""
+        """
+        Coin id for a name, symbol or id
+        
+        Answered from the local search index when it has an unambiguous exact
+        match; otherwise (or before the coin list is loaded) falls back to /search.
+        """
+        self.warm_coin_list()
+        coin_id = self.search_index.resolve(query)
+        if coin_id:
+            return coin_id
+        return await self.search_coin_remote(query)
+    
+    @cached("search")
+    async def search_coin_remote(self, query: str) -> Optional[str]:
+        """Search for a coin by name with CoinGecko /search and return its ID"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(f"{self.BASE_URL}/search", params={"query": query})
-                response.raise_for_status()
-                data = response.json()
-                
-                if data.get("coins"):
-                    return data["coins"][0]["id"]
-                return None
+            client = self.http.get(self.BASE_URL)
+            response = await rate_limiter.request("coingecko", client.get, f"{self.BASE_URL}/search", params={"query": query})
+            response.raise_for_status()
+            data = response.json()
+            
+            if data.get("coins"):
+                return data["coins"][0]["id"]
+            return None
         except Exception as e:
             logger.error(f"Error searching coin: {e}")
             return None
     
+    @cached("coin")
     async def get_coin_data(self, coin_id: str) -> Optional[Dict]:
         """Get comprehensive coin data"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.BASE_URL}/coins/{coin_id}",
-                    params={
-                        "localization": "false",
-                        "tickers": "false",
-                        "community_data": "true",
-                        "developer_data": "true"
-                    }
-                )
-                response.raise_for_status()
-                return response.json()
+            client = self.http.get(self.BASE_URL)
+            response = await rate_limiter.request(
+                "coingecko",
+                client.get,
+                f"{self.BASE_URL}/coins/{coin_id}",
+                params={
+                    "localization": "false",
+                    "tickers": "false",
+                    "community_data": "true",
+                    "developer_data": "true"
+                }
+            )
+            response.raise_for_status()
+            return response.json()
         except Exception as e:
             logger.error(f"Error fetching coin data: {e}")
             return None
     
-    async def get_token_metrics(self, project_name: str) -> Dict:
-        """Extract token metrics from CoinGecko"""
-        coin_id = await self.search_coin(project_name)
-        if not coin_id:
-            return {}
+    @cached("coin_list", memory=False)
+    async def fetch_coin_list(self) -> List[Dict]:
+        """Download /coins/list with platforms (every coin's contract addresses)"""
+        client = self.http.get(self.BASE_URL)
+        response = await rate_limiter.request(
+            "coingecko", client.get, f"{self.BASE_URL}/coins/list", params={"include_platform": "true"}
+        )
+        response.raise_for_status()
+        return [
+            {key: coin.get(key) for key in ("id", "symbol", "name", "platforms")}
+            for coin in response.json()
+        ]
+    
+    @cached("coin_list", memory=False)
+    async def fetch_market_ranks(self) -> Dict[str, int]:
+        """Market-cap rank of the top settings.COIN_SEARCH_RANKED_COINS coins, keyed by coin id"""
+        pages = -(-settings.COIN_SEARCH_RANKED_COINS // self.MARKETS_PAGE_SIZE)
+        client = self.http.get(self.BASE_URL)
+        responses = await asyncio.gather(*(
+            rate_limiter.request(
+                "coingecko",
+                client.get,
+                f"{self.BASE_URL}/coins/markets",
+                params={"vs_currency": "usd", "order": "market_cap_desc", "per_page": self.MARKETS_PAGE_SIZE, "page": page}
+            )
+            for page in range(1, pages + 1)
+        ))
+        ranks = {}
+        for response in responses:
+            response.raise_for_status()
+            for coin in response.json():
+                if coin.get("market_cap_rank"):
+                    ranks[coin["id"]] = coin["market_cap_rank"]
+        return ranks
+    
+    async def refresh_coin_list(self):
+        """Update the contract and search indexes from the (disk-cached) coin list"""
+        try:
+            coins = await self.fetch_coin_list()
+        except Exception as e:
+            self.catalogue.mark_failed()
+            logger.error(f"Error refreshing coin list (retry in {self.catalogue.retry_at - time.monotonic():.0f}s): {e}")
+            return
+        try:
+            ranks = await self.fetch_market_ranks()
+        except Exception as e:
+            # Still usable for ids, names and contracts; retried like a failed refresh
+            logger.error(f"Error fetching market-cap ranks: {e}")
+            ranks = {}
+        
+        changed = self.contracts.load(coins)
+        self.search_index.load(coins, ranks)
+        if ranks:
+            self.catalogue.mark_loaded()
+        else:
+            self.catalogue.mark_failed()
+        logger.info(
+            f"CoinGecko coin list loaded: {len(self.search_index)} coins, "
+            f"{len(self.contracts)} contract addresses ({changed} coins changed)"
+        )
+    
+    def warm_coin_list(self) -> Optional[asyncio.Task]:
+        """Start a coin list refresh in the background when one is due (single-flight)"""
+        task = self.catalogue._refresh_task
+        if (task is None or task.done()) and self.catalogue.refresh_due:
+            task = asyncio.ensure_future(self.refresh_coin_list())
+            self.catalogue._refresh_task = task
+        return task
+    
+    async def resolve_contract(self, address: str, platform: Optional[str] = None) -> Optional[Tuple[str, str]]:
+        """
+        (coin id, coin name) for a token contract address
         
+        Answered from the contract index; addresses it does not know (or all of
+        them, while the coin list is still loading) are looked up with
+        /coins/{platform}/contract/{address} and added to it.
+        """
+        self.warm_coin_list()
+        
+        found = self.contracts.lookup(address, platform)
+        if found:
+            return found
+        
+        for candidate in ([platform] if platform else CONTRACT_PLATFORMS):
+            data = await self.get_contract_coin(candidate, address.lower())
+            if data and data.get("id"):
+                self.contracts.add(data["id"], data.get("name"), candidate, address)
+                return data["id"], data.get("name") or data["id"]
+        return None
+    
+    @cached("coin")
+    async def get_contract_coin(self, platform: str, address: str) -> Optional[Dict]:
+        """Coin document for a contract address on one platform"""
+        try:
+            client = self.http.get(self.BASE_URL)
+            response = await rate_limiter.request(
+                "coingecko", client.get, f"{self.BASE_URL}/coins/{platform}/contract/{address}"
+            )
+            if response.status_code == 404:
+                return None
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            logger.error(f"Error fetching contract {address} on {platform}: {e}")
+            return None
+    
+    async def coin_name(self, coin_id: str) -> Optional[str]:
+        """A coin's own display name: from the local indexes, else its /coins/{id} document"""
+        name = self.search_index.name(coin_id) or self.contracts.name(coin_id)
+        if name:
+            return name
         data = await self.get_coin_data(coin_id)
+        return data.get("name") if data else None
+    
+    async def get_markets(self, coin_ids: List[str]) -> Dict[str, Dict]:
+        """
+        Market data for many coins at once, keyed by coin id
+        
+        Uses /coins/markets with up to MARKETS_PAGE_SIZE ids per call, so the number
+        of upstream calls grows with the number of pages, not coins.
+        """
+        ids = list(dict.fromkeys(coin_ids))
+        chunks = [ids[i:i + self.MARKETS_PAGE_SIZE] for i in range(0, len(ids), self.MARKETS_PAGE_SIZE)]
+        pages = await asyncio.gather(*(self._markets_page(chunk) for chunk in chunks))
+        return {coin["id"]: self._market_metrics(coin) for page in pages for coin in page}
+    
+    @cached("price")
+    async def _markets_page(self, coin_ids: List[str]) -> List[Dict]:
+        """One /coins/markets page; cached under the short-lived "price" kind"""
+        try:
+            client = self.http.get(self.BASE_URL)
+            response = await rate_limiter.request(
+                "coingecko",
+                client.get,
+                f"{self.BASE_URL}/coins/markets",
+                params={
+                    "vs_currency": "usd",
+                    "ids": ",".join(coin_ids),
+                    "per_page": len(coin_ids),
+                    "page": 1,
+                    "price_change_percentage": "7d"
+                }
+            )
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            logger.error(f"Error fetching markets for {len(coin_ids)} coins: {e}")
+            return []
+    
+    def _market_metrics(self, coin: Dict) -> Dict:
+        """Token metrics and tokenomics from a /coins/markets row"""
+        return {
+            "name": coin.get("name"),
+            "symbol": (coin.get("symbol") or "").upper(),
+            "market_cap_rank": coin.get("market_cap_rank"),
+            "price": coin.get("current_price"),
+            "market_cap": coin.get("market_cap"),
+            "fully_diluted_valuation": coin.get("fully_diluted_valuation"),
+            "volume_24h": coin.get("total_volume"),
+            "price_change_24h": coin.get("price_change_percentage_24h"),
+            "price_change_7d": coin.get("price_change_percentage_7d_in_currency"),
+            "total_supply": coin.get("total_supply"),
+            "circulating_supply": coin.get("circulating_supply"),
+            "max_supply": coin.get("max_supply"),
+        }
+    
+    def context(self, query: str, coin_id: Optional[str] = None, market: Optional[Dict] = None) -> "CoinContext":
+        """Create a request-scoped resolution context for a project"""
+        return CoinContext(self, query, coin_id, market)
+    
+    async def get_token_metrics(self, project_name: str, context: Optional["CoinContext"] = None) -> Dict:
+        """Extract token metrics from CoinGecko"""
+        context = context or self.context(project_name)
+        if context.market:
+            return {field: context.market.get(field) for field in TOKEN_METRIC_FIELDS}
+        
+        data = await context.document()
         if not data:
             return {}
         
@@ -66,13 +518,13 @@ class CoinGeckoService:
             "price_change_7d": market_data.get("price_change_percentage_7d"),
         }
     
-    async def get_tokenomics(self, project_name: str) -> Dict:
+    async def get_tokenomics(self, project_name: str, context: Optional["CoinContext"] = None) -> Dict:
         """Extract tokenomics data"""
-        coin_id = await self.search_coin(project_name)
-        if not coin_id:
-            return {}
+        context = context or self.context(project_name)
+        if context.market:
+            return {field: context.market.get(field) for field in TOKENOMICS_FIELDS}
         
-        data = await self.get_coin_data(coin_id)
+        data = await context.document()
         if not data:
             return {}
         
@@ -84,11 +536,79 @@ class CoinGeckoService:
             "max_supply": market_data.get("max_supply"),
         }
     
+    async def get_coin_info(self, project_name: str, context: Optional["CoinContext"] = None) -> Dict:
+        """Extract descriptive info (website, description, symbol, contract)"""
+        context = context or self.context(project_name)
+        if context.market:
+            # Seeded from a bulk market row: no /coins/{id} call, so no website or description
+            return {
+                "name": context.market.get("name"),
+                "symbol": context.market.get("symbol"),
+                "contract_address": self.contracts.address(await context.coin_id()),
+            }
+        
+        data = await context.document()
+        if not data:
+            return {}
+        
+        return {
+            "website": data.get("links", {}).get("homepage", [None])[0],
+            "description": data.get("description", {}).get("en", ""),
+            "symbol": data.get("symbol", "").upper(),
+            "contract_address": self._extract_contract_address(data),
+        }
+    
     async def get_contract_address(self, coin_id: str) -> Optional[str]:
         """Get contract address for a coin"""
         data = await self.get_coin_data(coin_id)
+        return self._extract_contract_address(data)
+    
+    def _extract_contract_address(self, data: Optional[Dict]) -> Optional[str]:
         if data and "platforms" in data:
             # Try to get Ethereum contract address
             platforms = data.get("platforms", {})
-            return platforms.get("ethereum") or next(iter(platforms.values()), None)
+            return platforms.get("ethereum") or next(iter(platforms.values()), None) or None
         return None
+
+
+class CoinContext:
+    """
+    Request-scoped CoinGecko resolution.
+    
+    The coin id is resolved once and the coin document fetched once; concurrent
+    callers within the same analysis share the single in-flight request. A
+    context may be seeded with an already resolved coin id and a market row
+    from get_markets (batch analyses), in which case token metrics and
+    tokenomics are served from that row and coin info from the row and the
+    contract index, without fetching the coin document.
+    """
+    
+    def __init__(self, service: CoinGeckoService, query: str, coin_id: Optional[str] = None,
+                 market: Optional[Dict] = None):
+        self.service = service
+        self.query = query
+        self.market = market
+        self._coin_id_task: Optional[asyncio.Future] = None
+        self._document_task: Optional[asyncio.Future] = None
+        if coin_id:
+            self._coin_id_task = asyncio.get_running_loop().create_future()
+            self._coin_id_task.set_result(coin_id)
+    
+    async def coin_id(self) -> Optional[str]:
+        """Resolved CoinGecko coin id (single-flight)"""
+        if self._coin_id_task is None:
+            self._coin_id_task = asyncio.ensure_future(self.service.search_coin(self.query))
+        # Shield so a caller hitting its own timeout does not cancel the shared fetch
+        return await asyncio.shield(self._coin_id_task)
+    
+    async def document(self) -> Optional[Dict]:
+        """Full /coins/{id} document (single-flight)"""
+        if self._document_task is None:
+            self._document_task = asyncio.ensure_future(self._fetch_document())
+        return await asyncio.shield(self._document_task)
+    
+    async def _fetch_document(self) -> Optional[Dict]:
+        coin_id = await self.coin_id()
+        if not coin_id:
+            return None
+        return await self.service.get_coin_data(coin_id)
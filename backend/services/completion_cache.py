@@ -0,0 +1,81 @@
+from typing import Optional
+from math import floor, log10
+from config import settings
+from services.cache_service import TieredCache, response_cache
+import hashlib
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def quantize(value, digits: Optional[int] = None):
+    """
+    Round a number to a few significant figures.
+    
+    Used for prompt inputs so small price moves map to the same bucket and reuse a
+    cached completion (e.g. 2245.67 -> 2200, 271_300_000 -> 270_000_000).
+    """
+    if not isinstance(value, (int, float)) or isinstance(value, bool) or value == 0:
+        return value
+    digits = digits or settings.LLM_QUANTIZE_DIGITS
+    rounded = round(value, digits - 1 - int(floor(log10(abs(value)))))
+    return int(rounded) if rounded == int(rounded) else rounded
+
+
+class CompletionCache:
+    """
+    Content-addressed cache for LLM completions.
+    
+    Entries are keyed on a fingerprint of model, system prompt, user prompt and
+    max_tokens and stored in the tiered cache under the "llm" kind (TTL from
+    settings.CACHE_TTLS, disk rows capped by settings.CACHE_DISK_LIMITS).
+    Every hit adds the original call's latency and tokens to the savings counters.
+    """
+    
+    KIND = "llm"
+    
+    def __init__(self, cache: Optional[TieredCache] = None):
+        self.cache = cache or response_cache
+        self.hits = 0
+        self.misses = 0
+        self.saved_latency = 0.0
+        self.saved_tokens = 0
+    
+    @staticmethod
+    def fingerprint(model: str, system_prompt: str, prompt: str, max_tokens: int) -> str:
+        payload = json.dumps([model, system_prompt, prompt, max_tokens])
+        return f"llm:{hashlib.sha256(payload.encode()).hexdigest()}"
+    
+    async def get(self, key: str) -> Optional[str]:
+        """Cached completion text, or None on a miss"""
+        if not settings.LLM_CACHE_ENABLED:
+            return None
+        
+        hit, entry = await self.cache.get(self.KIND, key)
+        if not hit:
+            self.misses += 1
+            return None
+        
+        self.hits += 1
+        self.saved_latency += entry.get("latency", 0.0)
+        self.saved_tokens += entry.get("tokens", 0)
+        return entry["content"]
+    
+    async def set(self, key: str, content: str, latency: float, tokens: int):
+        if not settings.LLM_CACHE_ENABLED:
+            return
+        await self.cache.set(self.KIND, key, {"content": content, "latency": latency, "tokens": tokens})
+    
+    def get_stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "saved_latency_seconds": round(self.saved_latency, 2),
+            "saved_tokens": self.saved_tokens,
+            "saved_cost_usd": round(self.saved_tokens / 1000 * settings.LLM_COST_PER_1K_TOKENS, 4),
+        }
+
+
+# Shared completion cache for ROMAService
+completion_cache = CompletionCache()
@@ -1,37 +1,175 @@
-import httpx
-from typing import Optional, Dict
+from typing import Optional, Dict, List, Tuple
+from config import settings
+from services.http_client import HTTPClientPool, http_clients
+from services.cache_service import cached
+from services.rate_limiter import rate_limiter
+from services.search_index import PrefixIndex, normalize_name
+import asyncio
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
+
+class ProtocolCatalogue:
+    """
+    Compact, indexed copy of DefiLlama's /protocols list.
+    
+    Only (name, slug, symbol, gecko_id) is kept per protocol, ordered by TVL so the
+    largest protocol wins ties. Lookups rank exact matches (name, slug, gecko_id,
+    symbol) ahead of name-prefix matches, and those ahead of substring matches.
+    A failed or empty download is retried with exponential backoff instead of
+    on every lookup.
+    """
+    
+    RETRY_BASE_SECONDS = 30
+    RETRY_MAX_SECONDS = 900
+    
+    def __init__(self):
+        self._entries: List[Tuple[str, str, str, str]] = []
+        self._exact: Dict[str, int] = {}
+        self._prefix = PrefixIndex()
+        self._names: List[str] = []
+        self.loaded_at: float = 0.0
+        self.failures = 0
+        self.retry_at: float = 0.0
+        self._refresh_task: Optional[asyncio.Task] = None
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    @property
+    def is_stale(self) -> bool:
+        return not self.loaded_at or time.monotonic() - self.loaded_at > settings.DEFILLAMA_CATALOGUE_TTL
+    
+    @property
+    def refresh_due(self) -> bool:
+        return self.is_stale and time.monotonic() >= self.retry_at
+    
+    def mark_loaded(self):
+        self.loaded_at = time.monotonic()
+        self.failures = 0
+        self.retry_at = 0.0
+    
+    def mark_failed(self):
+        delay = min(self.RETRY_MAX_SECONDS, self.RETRY_BASE_SECONDS * 2 ** self.failures)
+        self.failures += 1
+        self.retry_at = time.monotonic() + delay
+    
+    def load(self, protocols: List[Dict]):
+        """Rebuild the compact entries and indexes from a raw /protocols payload"""
+        protocols = sorted(protocols, key=lambda p: p.get("tvl") or 0, reverse=True)
+        entries = [
+            (p.get("name") or "", p.get("slug") or "", p.get("symbol") or "", p.get("gecko_id") or "")
+            for p in protocols
+            if p.get("slug")
+        ]
+        
+        # Earlier fields take precedence: a name match beats another protocol's symbol
+        exact: Dict[str, int] = {}
+        for field in range(4):
+            for idx, entry in enumerate(entries):
+                key = normalize_name(entry[field])
+                if key and key != "-":
+                    exact.setdefault(key, idx)
+        
+        names = [normalize_name(entry[0]) for entry in entries]
+        prefix = PrefixIndex((name, idx) for idx, name in enumerate(names) if name)
+        
+        # Swap in the new indexes in one step so readers never see a partial build
+        self._entries = entries
+        self._exact = exact
+        self._names = names
+        self._prefix = prefix
+    
+    def lookup(self, query: str) -> Optional[str]:
+        """Return the slug of the best matching protocol"""
+        key = normalize_name(query)
+        if not key or not self._entries:
+            return None
+        
+        idx = self._exact.get(key)
+        if idx is not None:
+            return self._entries[idx][1]
+        
+        # Prefix matches on the name, largest TVL first
+        best = min(self._prefix.matching(key), default=None)
+        if best is not None:
+            return self._entries[best][1]
+        
+        # Loose substring match as a last resort
+        for idx, name in enumerate(self._names):
+            if key in name:
+                return self._entries[idx][1]
+        return None
+
+
+# Shared across service instances so the catalogue is downloaded once per worker
+protocol_catalogue = ProtocolCatalogue()
+
+
 class DefiLlamaService:
     BASE_URL = "https://api.llama.fi"
     COINS_URL = "https://coins.llama.fi"
     
-    async def search_protocol(self, name: str) -> Optional[str]:
-        """Search for a protocol by name"""
+    def __init__(self, http: Optional[HTTPClientPool] = None, catalogue: Optional[ProtocolCatalogue] = None):
+        self.http = http or http_clients
+        self.catalogue = catalogue or protocol_catalogue
+    
+    @cached("protocols", memory=False)
+    async def fetch_protocols(self) -> List[Dict]:
+        """Download /protocols, keeping only the fields the catalogue indexes"""
+        client = self.http.get(self.BASE_URL)
+        response = await rate_limiter.request("defillama", client.get, f"{self.BASE_URL}/protocols")
+        response.raise_for_status()
+        return [
+            {key: protocol.get(key) for key in ("name", "slug", "symbol", "gecko_id", "tvl")}
+            for protocol in response.json()
+        ]
+    
+    async def refresh_catalogue(self):
+        """Rebuild the in-memory catalogue from the (disk-cached) protocol list"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(f"{self.BASE_URL}/protocols")
-                response.raise_for_status()
-                protocols = response.json()
-                
-                # Search for matching protocol
-                for protocol in protocols:
-                    if name.lower() in protocol.get("name", "").lower():
-                        return protocol.get("slug")
-                return None
+            protocols = await self.fetch_protocols()
+            if not protocols:
+                raise ValueError("empty protocol list")
         except Exception as e:
-            logger.error(f"Error searching protocol: {e}")
-            return None
+            self.catalogue.mark_failed()
+            logger.error(f"Error refreshing protocol catalogue (retry in {self.catalogue.retry_at - time.monotonic():.0f}s): {e}")
+            return
+        
+        self.catalogue.load(protocols)
+        self.catalogue.mark_loaded()
+        logger.info(f"DefiLlama catalogue loaded: {len(self.catalogue)} protocols")
+    
+    def warm_catalogue(self) -> Optional[asyncio.Task]:
+        """Start a catalogue refresh in the background when one is due (single-flight)"""
+        task = self.catalogue._refresh_task
+        if (task is None or task.done()) and self.catalogue.refresh_due:
+            task = asyncio.ensure_future(self.refresh_catalogue())
+            self.catalogue._refresh_task = task
+        return task
+    
+    async def search_protocol(self, name: str) -> Optional[str]:
+        """Search for a protocol by name"""
+        if not len(self.catalogue):
+            # Cold start: wait for the first download (not while backing off after a failure)
+            task = self.warm_catalogue()
+            if task is not None:
+                await asyncio.shield(task)
+        elif self.catalogue.is_stale:
+            # Serve the current copy and refresh behind it
+            self.warm_catalogue()
+        
+        return self.catalogue.lookup(name)
     
     async def get_protocol_data(self, slug: str) -> Optional[Dict]:
         """Get protocol TVL and other data"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(f"{self.BASE_URL}/protocol/{slug}")
-                response.raise_for_status()
-                return response.json()
+            client = self.http.get(self.BASE_URL)
+            response = await rate_limiter.request("defillama", client.get, f"{self.BASE_URL}/protocol/{slug}")
+            response.raise_for_status()
+            return response.json()
         except Exception as e:
             logger.error(f"Error fetching protocol data: {e}")
             return None
@@ -42,6 +180,7 @@ class DefiLlamaService:
         # This would need to be fetched from blockchain explorers like Etherscan
         return None
     
+    @cached("protocol")
     async def get_tvl_data(self, project_name: str) -> Dict:
         """Get TVL and DeFi metrics"""
         slug = await self.search_protocol(project_name)
@@ -52,10 +191,26 @@ class DefiLlamaService:
         if not data:
             return {}
         
+        # /protocol/{slug} returns the TVL history; keep only current values
+        tvl = data.get("tvl")
+        history = tvl if isinstance(tvl, list) else []
+        current_tvl = history[-1].get("totalLiquidityUSD") if history else tvl
+        mcap = data.get("mcap")
+        
         return {
-            "tvl": data.get("tvl"),
-            "chain_tvls": data.get("chainTvls", {}),
-            "change_1d": data.get("change_1d"),
-            "change_7d": data.get("change_7d"),
-            "mcap_tvl_ratio": data.get("mcaptvl"),
+            "tvl": current_tvl,
+            "chain_tvls": data.get("currentChainTvls", {}),
+            "change_1d": data.get("change_1d", self._tvl_change(history, 1)),
+            "change_7d": data.get("change_7d", self._tvl_change(history, 7)),
+            "mcap_tvl_ratio": data.get("mcaptvl") or (round(mcap / current_tvl, 4) if mcap and current_tvl else None),
         }
+    
+    def _tvl_change(self, history: List[Dict], days: int) -> Optional[float]:
+        """Percent change over the last `days` daily TVL points"""
+        if len(history) <= days:
+            return None
+        previous = history[-1 - days].get("totalLiquidityUSD")
+        current = history[-1].get("totalLiquidityUSD")
+        if not previous or current is None:
+            return None
+        return round((current - previous) / previous * 100, 2)
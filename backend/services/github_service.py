@@ -1,72 +1,119 @@
-from github import Github
-from typing import Optional, Dict, List
+from typing import Optional, Dict
+from datetime import datetime, timedelta, timezone
+from urllib.parse import parse_qs, urlsplit
 from config import settings
+from services.cache_service import cached
+from services.http_client import HTTPClientPool, http_clients
+from services.rate_limiter import rate_limiter
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
 
 class GitHubService:
-    def __init__(self):
-        self.client = Github(settings.GITHUB_TOKEN) if settings.GITHUB_TOKEN else None
+    """Async GitHub REST client on the shared connection pool"""
+    BASE_URL = "https://api.github.com"
+    
+    def __init__(self, http: Optional[HTTPClientPool] = None):
+        self.token = settings.GITHUB_TOKEN
+        self.http = http or http_clients
+        self.headers = {
+            "Accept": "application/vnd.github+json",
+            "X-GitHub-Api-Version": "2022-11-28",
+        }
+        if self.token:
+            self.headers["Authorization"] = f"Bearer {self.token}"
+    
+    async def _get(self, path: str, params: Optional[Dict] = None, bucket: str = "github"):
+        """GET on the core REST budget (search endpoints pass the smaller github_search bucket)"""
+        client = self.http.get(self.BASE_URL)
+        response = await rate_limiter.request(
+            bucket, client.get, f"{self.BASE_URL}{path}", params=params, headers=self.headers
+        )
+        response.raise_for_status()
+        return response
+    
+    async def _count(self, path: str, params: Optional[Dict] = None) -> Optional[int]:
+        """
+        Count items of a paginated list from its pagination metadata.
+        
+        With per_page=1 the page number of the `last` link equals the item count,
+        so no items need to be enumerated.
+        """
+        try:
+            response = await self._get(path, {**(params or {}), "per_page": 1})
+            if response.status_code == 204:  # empty repository
+                return 0
+            last = response.links.get("last", {}).get("url")
+            if last:
+                return int(parse_qs(urlsplit(last).query)["page"][0])
+            return len(response.json())
+        except Exception as e:
+            logger.error(f"Error counting {path}: {e}")
+            return None
     
     async def search_repository(self, project_name: str) -> Optional[str]:
         """Search for a repository by project name"""
-        if not self.client:
+        if not self.token:
             logger.warning("GitHub token not configured")
             return None
         
         try:
-            repos = self.client.search_repositories(query=project_name, sort="stars", order="desc")
-            if repos.totalCount > 0:
-                return repos[0].full_name
+            response = await self._get(
+                "/search/repositories",
+                {"q": project_name, "sort": "stars", "order": "desc", "per_page": 1},
+                bucket="github_search"
+            )
+            items = response.json().get("items", [])
+            if items:
+                return items[0]["full_name"]
             return None
         except Exception as e:
             logger.error(f"Error searching repository: {e}")
             return None
     
+    async def get_last_commit_date(self, repo_name: str) -> Optional[str]:
+        """Date of the most recent commit on the default branch"""
+        try:
+            response = await self._get(f"/repos/{repo_name}/commits", {"per_page": 1})
+            commits = response.json() if response.status_code != 204 else []
+            if commits:
+                return commits[0]["commit"]["author"]["date"]
+            return None
+        except Exception as e:
+            logger.error(f"Error fetching last commit: {e}")
+            return None
+    
     async def get_repository_metrics(self, repo_name: str) -> Dict:
         """Get comprehensive repository metrics"""
-        if not self.client:
+        if not self.token:
             return {}
         
+        since = (datetime.now(timezone.utc) - timedelta(days=30)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        
         try:
-            repo = self.client.get_repo(repo_name)
-            
-            # Get commit activity
-            commits = repo.get_commits()
-            recent_commits = 0
-            try:
-                from datetime import datetime, timedelta
-                one_month_ago = datetime.now() - timedelta(days=30)
-                for commit in commits:
-                    if commit.commit.author.date > one_month_ago:
-                        recent_commits += 1
-                    else:
-                        break
-            except:
-                recent_commits = 0
-            
-            # Get last commit date
-            last_commit = None
-            try:
-                last_commit_obj = commits[0]
-                last_commit = last_commit_obj.commit.author.date.isoformat()
-            except:
-                pass
+            repo_response, recent_commits, last_commit, contributors = await asyncio.gather(
+                self._get(f"/repos/{repo_name}"),
+                self._count(f"/repos/{repo_name}/commits", {"since": since}),
+                self.get_last_commit_date(repo_name),
+                self._count(f"/repos/{repo_name}/contributors", {"anon": "true"}),
+            )
+            repo = repo_response.json()
             
             return {
-                "github_stars": repo.stargazers_count,
-                "github_forks": repo.forks_count,
-                "commits_last_month": recent_commits,
-                "contributors": repo.get_contributors().totalCount,
+                "github_stars": repo.get("stargazers_count"),
+                "github_forks": repo.get("forks_count"),
+                "commits_last_month": recent_commits or 0,
+                "contributors": contributors,
                 "last_commit_date": last_commit,
-                "open_issues": repo.open_issues_count,
-                "watchers": repo.watchers_count,
+                "open_issues": repo.get("open_issues_count"),
+                "watchers": repo.get("watchers_count"),
             }
         except Exception as e:
             logger.error(f"Error fetching repository metrics: {e}")
             return {}
     
+    @cached("repo")
     async def get_technical_metrics(self, project_name: str) -> Dict:
         """Get technical development metrics"""
         repo_name = await self.search_repository(project_name)
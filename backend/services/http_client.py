@@ -0,0 +1,75 @@
+import httpx
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+from config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Upstream hosts that get a pooled client at startup
+UPSTREAM_HOSTS = [
+    "https://api.coingecko.com",
+    "https://api.llama.fi",
+    "https://api.github.com",
+    "https://openrouter.ai",
+]
+
+
+class HTTPClientPool:
+    """
+    One connection-pooled httpx.AsyncClient per upstream host.
+    
+    Clients are opened in the FastAPI lifespan hook and shared by all services so
+    TCP/TLS connections are kept alive between requests instead of being
+    re-established for every call.
+    """
+    
+    def __init__(self):
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+    
+    def _create_client(self) -> httpx.AsyncClient:
+        limits = httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+        )
+        return httpx.AsyncClient(
+            limits=limits,
+            timeout=settings.HTTP_TIMEOUT,
+            http2=settings.HTTP2_ENABLED and HTTP2_AVAILABLE,
+        )
+    
+    def get(self, url: str) -> httpx.AsyncClient:
+        """Return the pooled client for the host of `url`, creating it on first use"""
+        parts = urlsplit(url)
+        host = f"{parts.scheme}://{parts.netloc}"
+        client = self._clients.get(host)
+        if client is None or client.is_closed:
+            client = self._create_client()
+            self._clients[host] = client
+        return client
+    
+    async def startup(self, hosts: Optional[list] = None):
+        """Open pooled clients for the known upstream hosts"""
+        for host in hosts or UPSTREAM_HOSTS:
+            self.get(host)
+        logger.info(
+            f"HTTP client pool ready for {len(self._clients)} hosts "
+            f"(http2={settings.HTTP2_ENABLED and HTTP2_AVAILABLE})"
+        )
+    
+    async def shutdown(self):
+        """Close every pooled client"""
+        clients, self._clients = self._clients, {}
+        for client in clients.values():
+            await client.aclose()
+
+
+# Shared pool injected into the upstream services
+http_clients = HTTPClientPool()
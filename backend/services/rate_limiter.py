@@ -0,0 +1,181 @@
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Optional
+from config import settings
+import asyncio
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Absolute (epoch) deadline of the current request, set by the aggregation fan-out
+request_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+RETRY_STATUSES = (429, 503)
+
+
+def is_rate_limited(status: Optional[int], headers) -> bool:
+    """429/503, or GitHub's 403 with an exhausted quota or a Retry-After"""
+    if status in RETRY_STATUSES:
+        return True
+    return status == 403 and (
+        headers.get("x-ratelimit-remaining") == "0" or "retry-after" in headers
+    )
+
+
+class RateLimitExceeded(Exception):
+    """Raised when waiting for an upstream's rate limit would overrun the request deadline"""
+
+
+class RateLimiter:
+    """
+    Token-bucket limiter per upstream, shared by all services and uvicorn workers.
+    
+    Bucket state lives in a local SQLite file so every worker process on the host
+    draws from the same budget. Callers reserve a token and wait their turn (a
+    queue); if the wait would pass the request deadline the call is rejected
+    instead. Rate-limited responses are retried with jittered exponential backoff,
+    honoring Retry-After and X-RateLimit-Reset, and pause the bucket for everyone.
+    """
+    
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or os.path.join(settings.CACHE_DIR, "ratelimit.db")
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+    
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                "name TEXT PRIMARY KEY, tokens REAL, updated_at REAL, blocked_until REAL)"
+            )
+            self._conn = conn
+        return self._conn
+    
+    def _max_wait(self) -> float:
+        deadline = request_deadline.get()
+        if deadline is None:
+            return settings.RATE_LIMIT_MAX_WAIT
+        return max(0.0, deadline - time.time())
+    
+    def _reserve(self, name: str, max_wait: float) -> float:
+        """Atomically take a token; return how long the caller must wait before using it"""
+        rate, burst = settings.rate_limit(name)
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                row = db.execute(
+                    "SELECT tokens, updated_at, blocked_until FROM buckets WHERE name = ?", (name,)
+                ).fetchone()
+                tokens, updated_at, blocked_until = row if row else (burst, now, 0.0)
+                tokens = min(burst, tokens + (now - updated_at) * rate)
+                
+                # Tokens may go negative: each caller queues behind the ones before it
+                wait = max(blocked_until - now, (1 - tokens) / rate if tokens < 1 else 0.0)
+                if wait > max_wait:
+                    db.execute("ROLLBACK")
+                    raise RateLimitExceeded(f"{name}: rate limit wait {wait:.1f}s exceeds deadline")
+                
+                db.execute(
+                    "INSERT OR REPLACE INTO buckets (name, tokens, updated_at, blocked_until) VALUES (?, ?, ?, ?)",
+                    (name, tokens - 1, now, blocked_until)
+                )
+                db.execute("COMMIT")
+                return wait
+            except sqlite3.Error:
+                db.execute("ROLLBACK")
+                raise
+    
+    def _block(self, name: str, seconds: float):
+        """Pause an upstream for every worker, e.g. after a 429"""
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            db.execute(
+                "INSERT INTO buckets (name, tokens, updated_at, blocked_until) VALUES (?, 0, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET blocked_until = MAX(blocked_until, excluded.blocked_until)",
+                (name, now, now + seconds)
+            )
+    
+    def _retry_delay(self, headers, attempt: int) -> float:
+        """Delay before the next attempt from Retry-After / X-RateLimit-Reset, else jittered backoff"""
+        retry_after = headers.get("retry-after")
+        if retry_after:
+            try:
+                return max(0.0, float(retry_after))
+            except ValueError:
+                try:
+                    return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+                except (TypeError, ValueError):
+                    pass
+        
+        reset = headers.get("x-ratelimit-reset") or headers.get("x-rate-limit-reset")
+        if reset:
+            try:
+                reset = float(reset)
+                if reset > 1e12:  # milliseconds since epoch
+                    reset /= 1000
+                return max(0.0, reset - time.time())
+            except ValueError:
+                pass
+        
+        return random.uniform(0, settings.RATE_LIMIT_BACKOFF_BASE * 2 ** attempt)
+    
+    async def acquire(self, name: str):
+        """Wait for a token for `name` (raises RateLimitExceeded past the deadline)"""
+        wait = await asyncio.to_thread(self._reserve, name, self._max_wait())
+        if wait > 0:
+            await asyncio.sleep(wait)
+    
+    async def request(self, name: str, send: Callable, *args, **kwargs) -> Any:
+        """
+        Rate-limited call of an async HTTP method, e.g.
+        `await rate_limiter.request("coingecko", client.get, url, params=...)`
+        """
+        attempt = 0
+        while True:
+            await self.acquire(name)
+            response = await send(*args, **kwargs)
+            if not is_rate_limited(response.status_code, response.headers) or attempt >= settings.RATE_LIMIT_MAX_RETRIES:
+                return response
+            
+            delay = self._retry_delay(response.headers, attempt)
+            if delay > self._max_wait():
+                return response
+            logger.warning(f"{name} returned {response.status_code}, retrying in {delay:.1f}s")
+            await asyncio.to_thread(self._block, name, delay)
+            attempt += 1
+    
+    def call_sync(self, name: str, func: Callable, *args, **kwargs) -> Any:
+        """Blocking variant for SDK calls made in worker threads (e.g. tweepy)"""
+        attempt = 0
+        while True:
+            wait = self._reserve(name, self._max_wait())
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                response = getattr(e, "response", None)
+                status = getattr(response, "status_code", None)
+                if not is_rate_limited(status, getattr(response, "headers", {})) or attempt >= settings.RATE_LIMIT_MAX_RETRIES:
+                    raise
+                delay = self._retry_delay(response.headers, attempt)
+                if delay > self._max_wait():
+                    raise
+                logger.warning(f"{name} returned {status}, retrying in {delay:.1f}s")
+                self._block(name, delay)
+                attempt += 1
+
+
+# Shared limiter for all upstream services
+rate_limiter = RateLimiter()
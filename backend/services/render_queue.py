@@ -0,0 +1,200 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Optional
+from cachetools import TTLCache
+from config import settings
+from models.schemas import AnalysisResponse, ReportJob
+from services.report_index import report_index
+from services.report_service import ReportService
+import asyncio
+import logging
+import math
+import multiprocessing
+import uuid
+
+logger = logging.getLogger(__name__)
+
+
+class RenderQueueFull(Exception):
+    """Raised when the render backlog is full; retry after `retry_after` seconds"""
+    
+    def __init__(self, retry_after: int):
+        super().__init__(f"Report render queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+def _render(kind: str, payload: Dict) -> str:
+    """Render a report in a worker process and return its filename"""
+    service = ReportService()
+    if kind == "comparison":
+        projects = [AnalysisResponse(**project) for project in payload.get("projects", [])]
+        return service.generate_comparison_report({**payload, "projects": projects})
+    return service.generate_report(AnalysisResponse(**payload))
+
+
+@dataclass
+class RenderJob:
+    id: str
+    kind: str
+    project: Optional[str] = None
+    content_hash: Optional[str] = None
+    status: str = "queued"
+    filename: Optional[str] = None
+    error: Optional[str] = None
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    finished_at: Optional[datetime] = None
+    task: Optional[asyncio.Task] = None
+    
+    @property
+    def report_url(self) -> Optional[str]:
+        return f"/reports/{self.filename}" if self.filename else None
+    
+    async def wait(self) -> str:
+        """Wait for the render and return the filename (raises if it failed)"""
+        if self.task:
+            await asyncio.shield(self.task)
+        if self.status == "failed":
+            raise RuntimeError(self.error)
+        return self.filename
+    
+    def to_schema(self) -> ReportJob:
+        return ReportJob(
+            job_id=self.id,
+            kind=self.kind,
+            status=self.status,
+            report_url=self.report_url,
+            error=self.error,
+            created_at=self.created_at.isoformat(),
+            finished_at=self.finished_at.isoformat() if self.finished_at else None
+        )
+
+
+class RenderQueue:
+    """
+    Bounded queue of PDF renders running in a process pool.
+    
+    ReportLab work is CPU-bound, so it runs outside the event loop in
+    settings.REPORT_WORKERS processes. At most settings.REPORT_QUEUE_SIZE jobs
+    may be queued or running; beyond that submitting raises RenderQueueFull with
+    an estimated Retry-After so callers can shed load instead of piling up.
+    Finished jobs are kept for settings.REPORT_JOB_TTL seconds for polling.
+    
+    Reports are content-addressed, so content that is already on disk completes
+    immediately and a render already in flight is shared rather than repeated.
+    """
+    
+    def __init__(self, workers: Optional[int] = None, max_pending: Optional[int] = None):
+        self.workers = workers or settings.REPORT_WORKERS
+        self.max_pending = max_pending or settings.REPORT_QUEUE_SIZE
+        self.jobs: TTLCache = TTLCache(maxsize=4096, ttl=settings.REPORT_JOB_TTL)
+        self.pending = 0
+        self.inflight: Dict[str, RenderJob] = {}
+        self.reports = ReportService()
+        self.avg_duration = 1.0
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+    
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: forking a process with live threads and sockets is unsafe
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+    
+    def submit_report(self, analysis: AnalysisResponse) -> RenderJob:
+        """Queue a single-project report"""
+        digest = self.reports.analysis_hash(analysis)
+        job = RenderJob(
+            id=uuid.uuid4().hex,
+            kind="analysis",
+            project=analysis.project_data.project_name,
+            content_hash=digest
+        )
+        return self._submit(job, self.reports.report_filename(analysis, digest), analysis.dict())
+    
+    def submit_comparison(self, comparison_data: Dict) -> RenderJob:
+        """Queue a comparison report"""
+        payload = {
+            **comparison_data,
+            "projects": [project.dict() for project in comparison_data.get("projects", [])]
+        }
+        digest = self.reports.comparison_hash(comparison_data)
+        job = RenderJob(id=uuid.uuid4().hex, kind="comparison", content_hash=digest)
+        return self._submit(job, self.reports.comparison_filename(comparison_data, digest), payload)
+    
+    def get(self, job_id: str) -> Optional[RenderJob]:
+        return self.jobs.get(job_id)
+    
+    def _submit(self, job: RenderJob, filename: str, payload: Dict) -> RenderJob:
+        if filename in self.inflight:
+            return self.inflight[filename]
+        
+        if self.reports.exists(filename):
+            job.status = "done"
+            job.filename = filename
+            job.finished_at = job.created_at
+            self.jobs[job.id] = job
+            # Reuse counts as an access, keeping the file out of retention's reach
+            asyncio.ensure_future(asyncio.to_thread(report_index.touch, filename))
+            return job
+        
+        if self.pending >= self.max_pending:
+            raise RenderQueueFull(self.retry_after())
+        
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.workers)
+        
+        self.jobs[job.id] = job
+        self.inflight[filename] = job
+        self.pending += 1
+        job.task = asyncio.ensure_future(self._run(job, filename, payload))
+        return job
+    
+    async def _run(self, job: RenderJob, filename: str, payload: Dict):
+        loop = asyncio.get_running_loop()
+        executor = None
+        try:
+            async with self._slots:
+                job.status = "running"
+                started = loop.time()
+                executor = self._pool()
+                job.filename = await loop.run_in_executor(executor, _render, job.kind, payload)
+                self.avg_duration = 0.8 * self.avg_duration + 0.2 * (loop.time() - started)
+            await asyncio.to_thread(
+                report_index.record, job.filename, job.kind, job.project, job.content_hash, job.id
+            )
+            job.status = "done"
+            logger.info(f"Report generated: {job.filename}")
+        except BrokenProcessPool as e:
+            # A worker died (e.g. OOM); start a fresh pool for the next job
+            job.status = "failed"
+            job.error = str(e)
+            logger.error(f"Render pool broken, restarting: {e}")
+            # Other jobs on the same pool fail too; only the first one replaces it
+            if self._executor is executor:
+                self.shutdown()
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            logger.error(f"Error generating {job.kind} report: {e}")
+        finally:
+            job.finished_at = datetime.utcnow()
+            self.inflight.pop(filename, None)
+            self.pending -= 1
+    
+    def retry_after(self) -> int:
+        """Seconds until the current backlog should have drained"""
+        return max(1, math.ceil(self.avg_duration * self.pending / self.workers))
+    
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Shared render queue for all routers
+render_queue = RenderQueue()
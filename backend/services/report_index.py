@@ -0,0 +1,221 @@
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from config import settings
+import base64
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# <Project>_<hash16>.pdf (content-addressed) or legacy <Project>_<YYYYmmdd>_<HHMMSS>.pdf
+REPORT_NAME = re.compile(r"^(?P<project>.+?)_(?:[0-9a-f]{16}|\d{8}_\d{6})\.pdf$")
+
+
+class ReportIndex:
+    """
+    Persistent catalogue of generated PDF reports.
+    
+    One SQLite row per file (project, creation time, size, content hash, id of
+    the render that produced it and last access), written whenever a report is
+    rendered so listing never has to scan REPORTS_DIR. Reports that predate the
+    index are picked up by a one-time `backfill`.
+    """
+    
+    def __init__(self, db_path: Optional[str] = None, reports_dir: Optional[str] = None):
+        self.db_path = db_path or os.path.join(settings.DATA_DIR, "reports.db")
+        self.reports_dir = reports_dir or settings.REPORTS_DIR
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+    
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=5)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS reports ("
+                "filename TEXT PRIMARY KEY, kind TEXT, project TEXT, created_at REAL, "
+                "size INTEGER, content_hash TEXT, analysis_id TEXT, last_accessed REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS reports_created ON reports (created_at, filename)")
+            conn.execute("CREATE INDEX IF NOT EXISTS reports_accessed ON reports (last_accessed)")
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS reports_project ON reports (project COLLATE NOCASE, created_at)"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+    
+    def record(self, filename: str, kind: str, project: Optional[str], content_hash: Optional[str] = None,
+               analysis_id: Optional[str] = None, created_at: Optional[float] = None):
+        """Add or refresh the entry for a report that was just written"""
+        size = os.path.getsize(os.path.join(self.reports_dir, filename))
+        created_at = created_at or time.time()
+        with self._lock:
+            db = self._db()
+            db.execute(
+                "INSERT INTO reports (filename, kind, project, created_at, size, content_hash, analysis_id, last_accessed) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT(filename) DO UPDATE SET "
+                "size = excluded.size, content_hash = excluded.content_hash, analysis_id = excluded.analysis_id",
+                (filename, kind, project, created_at, size, content_hash, analysis_id, created_at)
+            )
+            db.commit()
+    
+    def touch(self, filename: str):
+        """Mark a report as accessed (downloaded)"""
+        with self._lock:
+            db = self._db()
+            db.execute("UPDATE reports SET last_accessed = ? WHERE filename = ?", (time.time(), filename))
+            db.commit()
+    
+    def remove(self, filename: str):
+        with self._lock:
+            db = self._db()
+            db.execute("DELETE FROM reports WHERE filename = ?", (filename,))
+            db.commit()
+    
+    def claim(self, filename: str, accessed_before: float, created_before: float) -> bool:
+        """
+        Remove a report's row only if it is still unused since the given times
+        
+        Returns False when the report was accessed or re-recorded after it was
+        picked for eviction; its file must then be kept.
+        """
+        with self._lock:
+            db = self._db()
+            cursor = db.execute(
+                "DELETE FROM reports WHERE filename = ? AND last_accessed < ? AND created_at < ?",
+                (filename, accessed_before, created_before)
+            )
+            db.commit()
+        return cursor.rowcount == 1
+    
+    def usage(self) -> Tuple[int, int]:
+        """(number of reports, total bytes)"""
+        with self._lock:
+            count, size = self._db().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM reports").fetchone()
+        return count, size
+    
+    def least_recently_used(self, accessed_before: float, created_before: float, limit: int = 100) -> List[Tuple[str, int]]:
+        """(filename, size) of reports last accessed and created before the given times, oldest access first"""
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT filename, size FROM reports WHERE last_accessed < ? AND created_at < ? "
+                "ORDER BY last_accessed LIMIT ?",
+                (accessed_before, created_before, limit)
+            ).fetchall()
+        return [(row["filename"], row["size"]) for row in rows]
+    
+    def list(self, project: Optional[str] = None, kind: Optional[str] = None,
+             since: Optional[datetime] = None, until: Optional[datetime] = None,
+             cursor: Optional[str] = None, limit: int = 50) -> Tuple[List[Dict], Optional[str]]:
+        """
+        One page of reports, newest first
+        
+        Returns (reports, next_cursor); pass next_cursor back to get the next page.
+        """
+        clauses, params = [], []
+        if project:
+            clauses.append("project = ? COLLATE NOCASE")
+            params.append(project)
+        if kind:
+            clauses.append("kind = ?")
+            params.append(kind)
+        if since:
+            clauses.append("created_at >= ?")
+            params.append(self._epoch(since))
+        if until:
+            clauses.append("created_at < ?")
+            params.append(self._epoch(until))
+        if cursor:
+            created_at, filename = self._decode_cursor(cursor)
+            clauses.append("(created_at < ? OR (created_at = ? AND filename < ?))")
+            params.extend([created_at, created_at, filename])
+        
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._db().execute(
+                f"SELECT * FROM reports {where} ORDER BY created_at DESC, filename DESC LIMIT ?",
+                (*params, limit + 1)
+            ).fetchall()
+        
+        reports = [self._to_dict(row) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last = rows[limit - 1]
+            next_cursor = self._encode_cursor(last["created_at"], last["filename"])
+        return reports, next_cursor
+    
+    def backfill(self):
+        """Index reports written before the index existed (runs once)"""
+        with self._lock:
+            done = self._db().execute("SELECT value FROM meta WHERE key = 'backfilled'").fetchone()
+        if done or not os.path.isdir(self.reports_dir):
+            return
+        
+        count = 0
+        for entry in os.scandir(self.reports_dir):
+            if not entry.name.endswith(".pdf"):
+                continue
+            match = REPORT_NAME.match(entry.name)
+            project = match.group("project").replace("_", " ") if match else None
+            kind = "comparison" if project == "comparison" else "analysis"
+            with self._lock:
+                db = self._db()
+                db.execute(
+                    "INSERT OR IGNORE INTO reports (filename, kind, project, created_at, size, last_accessed) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (entry.name, kind, None if kind == "comparison" else project,
+                     entry.stat().st_mtime, entry.stat().st_size, entry.stat().st_atime)
+                )
+            count += 1
+        
+        with self._lock:
+            db = self._db()
+            db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('backfilled', ?)", (str(time.time()),))
+            db.commit()
+        logger.info(f"Report index backfilled with {count} existing reports")
+    
+    def _to_dict(self, row: sqlite3.Row) -> Dict:
+        return {
+            "filename": row["filename"],
+            "kind": row["kind"],
+            "project": row["project"],
+            "created_at": datetime.utcfromtimestamp(row["created_at"]).isoformat(),
+            "size": row["size"],
+            "content_hash": row["content_hash"],
+            "analysis_id": row["analysis_id"],
+            "url": f"/reports/{row['filename']}",
+        }
+    
+    def _epoch(self, moment: datetime) -> float:
+        """Timestamps are UTC, like the rest of the API"""
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=timezone.utc)
+        return moment.timestamp()
+    
+    def _encode_cursor(self, created_at: float, filename: str) -> str:
+        return base64.urlsafe_b64encode(json.dumps([created_at, filename]).encode()).decode()
+    
+    def _decode_cursor(self, cursor: str) -> Tuple[float, str]:
+        try:
+            created_at, filename = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            return float(created_at), str(filename)
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"Invalid cursor: {cursor}") from e
+    
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+# Shared report index
+report_index = ReportIndex()
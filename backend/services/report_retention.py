@@ -0,0 +1,129 @@
+from typing import Dict, Optional
+from config import settings
+from services.render_queue import render_queue
+from services.report_index import ReportIndex, report_index
+import asyncio
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class ReportRetention:
+    """
+    Keeps REPORTS_DIR within a byte quota and a maximum age.
+    
+    Reports not downloaded for settings.REPORTS_MAX_AGE are removed, then the
+    least recently downloaded ones until the total size fits
+    settings.REPORTS_MAX_BYTES. Each sweep deletes at most one batch per pass
+    and runs in a worker thread, so eviction never blocks requests. Files
+    created or accessed within settings.REPORT_RETENTION_GRACE are never
+    touched: a render may still be writing them or a client may just have
+    been handed their URL.
+    """
+    
+    def __init__(self, index: Optional[ReportIndex] = None, reports_dir: Optional[str] = None):
+        self.index = index or report_index
+        self.reports_dir = reports_dir or settings.REPORTS_DIR
+        self.reclaimed_bytes = 0
+        self.reclaimed_files = 0
+        self.last_sweep: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+    
+    def sweep(self) -> Dict[str, int]:
+        """Run one incremental eviction pass and return what it reclaimed"""
+        now = time.time()
+        recent = now - settings.REPORT_RETENTION_GRACE
+        freed = {"files": 0, "bytes": 0}
+        
+        # Expired: not accessed within the maximum age
+        expired = now - settings.REPORTS_MAX_AGE
+        for filename, size in self.index.least_recently_used(expired, recent, settings.REPORT_RETENTION_BATCH):
+            self._evict(filename, size, expired, recent, freed)
+        
+        # Over quota: least recently used first
+        _, total = self.index.usage()
+        if total > settings.REPORTS_MAX_BYTES:
+            for filename, size in self.index.least_recently_used(recent, recent, settings.REPORT_RETENTION_BATCH):
+                if total <= settings.REPORTS_MAX_BYTES:
+                    break
+                if self._evict(filename, size, recent, recent, freed):
+                    total -= size
+        
+        self._remove_stale_temp_files(recent)
+        
+        self.reclaimed_files += freed["files"]
+        self.reclaimed_bytes += freed["bytes"]
+        self.last_sweep = now
+        if freed["files"]:
+            logger.info(f"Report retention reclaimed {freed['bytes']} bytes in {freed['files']} files")
+        return freed
+    
+    def _evict(self, filename: str, size: int, accessed_before: float, created_before: float,
+               freed: Dict[str, int]) -> bool:
+        # A render of this exact content may be in flight; leave it alone
+        if filename in render_queue.inflight:
+            return False
+        # Claim the row first: a report served or re-rendered since the batch was
+        # picked no longer matches, and its file is kept
+        if not self.index.claim(filename, accessed_before, created_before):
+            return False
+        try:
+            os.remove(os.path.join(self.reports_dir, filename))
+        except FileNotFoundError:
+            size = 0  # already deleted (manually or by another worker)
+        except OSError as e:
+            logger.error(f"Error evicting report {filename}: {e}")
+        freed["files"] += 1
+        freed["bytes"] += size
+        return True
+    
+    def _remove_stale_temp_files(self, older_than: float):
+        """Partial files left behind by renders that crashed mid-write"""
+        if not os.path.isdir(self.reports_dir):
+            return
+        for entry in os.scandir(self.reports_dir):
+            if entry.name.endswith(".tmp") and entry.stat().st_mtime < older_than:
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+    
+    async def run(self):
+        """Background loop: one sweep every settings.REPORT_RETENTION_INTERVAL seconds"""
+        while True:
+            try:
+                await asyncio.to_thread(self.sweep)
+            except Exception as e:
+                logger.error(f"Report retention sweep failed: {e}")
+            await asyncio.sleep(settings.REPORT_RETENTION_INTERVAL)
+    
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self.run())
+    
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    def get_stats(self) -> Dict:
+        count, size = self.index.usage()
+        return {
+            "reports": count,
+            "bytes": size,
+            "quota_bytes": settings.REPORTS_MAX_BYTES,
+            "max_age_seconds": settings.REPORTS_MAX_AGE,
+            "reclaimed_files": self.reclaimed_files,
+            "reclaimed_bytes": self.reclaimed_bytes,
+            "last_sweep": self.last_sweep,
+        }
+
+
+# Shared retention manager, started by the app lifespan
+report_retention = ReportRetention()
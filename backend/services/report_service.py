@@ -1,37 +1,79 @@
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.lib import colors
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image, PageBreak
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
-from reportlab.pdfgen import canvas
-import matplotlib.pyplot as plt
-import io
+# reportlab is imported inside the render methods: they only run in render
+# worker processes, so API workers never pay for loading it
 from datetime import datetime
-from typing import Dict
+from typing import Dict, Optional
+import hashlib
+import json
 import os
 
 from models.schemas import AnalysisResponse
 from config import settings
 
+# Fields that change between identical analyses and must not affect the report key
+VOLATILE_FIELDS = {"report_url", "report_job_id", "analysis_timestamp"}
+
 class ReportService:
     """Generate beautiful PDF reports"""
     
+    # Bump when the layout changes so existing reports are re-rendered
+    TEMPLATE_VERSION = "1"
+    
     def __init__(self):
         self.reports_dir = settings.REPORTS_DIR
         os.makedirs(self.reports_dir, exist_ok=True)
     
+    def content_hash(self, content) -> str:
+        """Hash of the report content and template version"""
+        payload = json.dumps([self.TEMPLATE_VERSION, content], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+    
+    def analysis_hash(self, analysis: AnalysisResponse) -> str:
+        return self.content_hash(analysis.dict(exclude=VOLATILE_FIELDS))
+    
+    def comparison_hash(self, comparison_data: Dict) -> str:
+        projects = [project.dict(exclude=VOLATILE_FIELDS) for project in comparison_data.get('projects', [])]
+        return self.content_hash([projects, comparison_data.get('comparative_summary', '')])
+    
+    def report_filename(self, analysis: AnalysisResponse, digest: Optional[str] = None) -> str:
+        """Content-addressed filename: identical analyses share one PDF"""
+        project_name = analysis.project_data.project_name.replace(" ", "_")
+        return f"{project_name}_{(digest or self.analysis_hash(analysis))[:16]}.pdf"
+    
+    def comparison_filename(self, comparison_data: Dict, digest: Optional[str] = None) -> str:
+        return f"comparison_{(digest or self.comparison_hash(comparison_data))[:16]}.pdf"
+    
+    def exists(self, filename: str) -> bool:
+        return os.path.exists(os.path.join(self.reports_dir, filename))
+    
+    def _build(self, filename: str, story: list):
+        """Write the PDF via a temporary file so readers never see a partial report"""
+        from reportlab.lib.pagesizes import letter
+        from reportlab.platypus import SimpleDocTemplate
+        
+        filepath = os.path.join(self.reports_dir, filename)
+        tmp_path = f"{filepath}.{os.getpid()}.tmp"
+        try:
+            SimpleDocTemplate(tmp_path, pagesize=letter).build(story)
+            os.replace(tmp_path, filepath)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    
     def generate_report(self, analysis: AnalysisResponse) -> str:
-        """Generate comprehensive PDF report"""
+        """Generate comprehensive PDF report (skipped if this content was already rendered)"""
         
         # Create filename
-        project_name = analysis.project_data.project_name.replace(" ", "_")
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{project_name}_{timestamp}.pdf"
-        filepath = os.path.join(self.reports_dir, filename)
+        filename = self.report_filename(analysis)
+        if self.exists(filename):
+            return filename
+        
+        from reportlab.lib import colors
+        from reportlab.lib.units import inch
+        from reportlab.platypus import Table, TableStyle, Paragraph, Spacer, PageBreak
+        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+        from reportlab.lib.enums import TA_CENTER
         
         # Create PDF
-        doc = SimpleDocTemplate(filepath, pagesize=letter)
         story = []
         styles = getSampleStyleSheet()
         
@@ -157,17 +199,21 @@ class ReportService:
         story.append(Paragraph(footer_text, styles['Normal']))
         
         # Build PDF
-        doc.build(story)
+        self._build(filename, story)
         
         return filename
     
     def generate_comparison_report(self, comparison_data: Dict) -> str:
-        """Generate comparison report for multiple projects"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"comparison_{timestamp}.pdf"
-        filepath = os.path.join(self.reports_dir, filename)
+        """Generate comparison report for multiple projects (skipped if already rendered)"""
+        filename = self.comparison_filename(comparison_data)
+        if self.exists(filename):
+            return filename
+        
+        from reportlab.lib import colors
+        from reportlab.lib.units import inch
+        from reportlab.platypus import Table, TableStyle, Paragraph, Spacer
+        from reportlab.lib.styles import getSampleStyleSheet
         
-        doc = SimpleDocTemplate(filepath, pagesize=letter)
         story = []
         styles = getSampleStyleSheet()
         
@@ -207,5 +253,5 @@ class ReportService:
         story.append(Paragraph("Comparative Analysis", styles['Heading2']))
         story.append(Paragraph(comparison_data.get('comparative_summary', ''), styles['Normal']))
         
-        doc.build(story)
+        self._build(filename, story)
         return filename
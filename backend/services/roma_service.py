@@ -1,17 +1,27 @@
-import httpx
-from typing import Dict, List
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 from config import settings
+from services.http_client import HTTPClientPool, http_clients
+from services.completion_cache import completion_cache, quantize
+from services.rate_limiter import rate_limiter
+from services.scoring_service import ScoringService
+import asyncio
 import logging
 import json
+import re
+import time
 
 logger = logging.getLogger(__name__)
 
 class ROMAService:
     """OpenRouter AI Integration for AI Analysis"""
     BASE_URL = "https://openrouter.ai/api/v1"
+    MODEL = "openai/gpt-3.5-turbo"
+    SYSTEM_PROMPT = "You are a crypto analyst AI that provides concise, objective analysis."
     
-    def __init__(self):
+    def __init__(self, http: Optional[HTTPClientPool] = None):
         self.api_key = settings.OPENROUTER_API_KEY
+        self.http = http or http_clients
+        self.scoring = ScoringService()
         self.headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
@@ -19,6 +29,117 @@ class ROMAService:
             "X-Title": "DeepDive AI"
         }
     
+    async def analyze_project(self, project_data: Dict, emit: Optional[Callable[[str, Any], Awaitable[None]]] = None) -> Dict:
+        """
+        Produce all four AI sections for a project
+        
+        settings.ROMA_MODE selects how the LLM is called:
+        - "parallel": independent prompts run concurrently; the thesis starts as soon as scores are ready
+        - "consolidated": one structured JSON completion for all sections
+        - "sequential": one prompt after another
+        
+        If `emit` is given, each section is passed to it (name, data) as soon as it is ready.
+        """
+        async def section(name: str, coro: Awaitable):
+            result = await coro
+            if emit:
+                await emit(name, result)
+            return result
+        
+        mode = settings.ROMA_MODE
+        if mode == "consolidated":
+            sections = await self._analyze_consolidated(project_data)
+            if emit:
+                for name, result in sections.items():
+                    await emit(name, result)
+            return sections
+        
+        if mode == "parallel":
+            scores_task = asyncio.ensure_future(section("scores", self.calculate_scores(project_data)))
+            
+            async def thesis_after_scores():
+                return await self.generate_investment_thesis(project_data, await scores_task)
+            
+            summary, scores, risk, thesis = await asyncio.gather(
+                section("executive_summary", self.generate_executive_summary(project_data)),
+                scores_task,
+                section("risk_flags", self.analyze_risk_flags(project_data)),
+                section("investment_thesis", thesis_after_scores())
+            )
+        else:
+            summary = await section("executive_summary", self.generate_executive_summary(project_data))
+            scores = await section("scores", self.calculate_scores(project_data))
+            risk = await section("risk_flags", self.analyze_risk_flags(project_data))
+            thesis = await section("investment_thesis", self.generate_investment_thesis(project_data, scores))
+        
+        return {
+            "executive_summary": summary,
+            "scores": scores,
+            "risk_flags": risk,
+            "investment_thesis": thesis,
+        }
+    
+    async def _analyze_consolidated(self, project_data: Dict) -> Dict:
+        """Ask for every section in one JSON completion, falling back per section"""
+        token_metrics = project_data.get('token_metrics', {})
+        technical_metrics = project_data.get('technical_metrics', {})
+        social_metrics = project_data.get('social_metrics', {})
+        
+        prompt = f"""
+Analyze this crypto project and produce a complete research note.
+
+Project: {project_data.get('project_name')}
+Description: {project_data.get('description', 'N/A')}
+Price: ${self._fmt(token_metrics.get('price'))}
+Market Cap: ${self._fmt(token_metrics.get('market_cap'))}
+24h Volume: ${self._fmt(token_metrics.get('volume_24h'))}
+Holders: {self._fmt(token_metrics.get('holders'))}
+GitHub Stars: {self._fmt(technical_metrics.get('github_stars'))}
+Contributors: {self._fmt(technical_metrics.get('contributors'))}
+Commits (Last Month): {self._fmt(technical_metrics.get('commits_last_month'))}
+Last GitHub Commit: {technical_metrics.get('last_commit_date', 'N/A')}
+Twitter Followers: {self._fmt(social_metrics.get('twitter_followers'))}
+
+Respond with a single JSON object:
+{{
+  "executive_summary": "<professional, objective summary of about 100 words>",
+  "scores": {{
+    "team_credibility": <0-10>,
+    "product_market_fit": <0-10>,
+    "tokenomics_health": <0-10>,
+    "community_strength": <0-10>,
+    "technical_development": <0-10>
+  }},
+  "risk_flags": {{"level": "green|yellow|red", "flags": ["flag1", ...]}},
+  "investment_thesis": {{
+    "bull_case": ["point1", ...],
+    "bear_case": ["point1", ...],
+    "recommendation": "Strong Buy|Buy|Moderate Buy|Hold|Sell"
+  }}
+}}
+"""
+        
+        try:
+            data = self._parse_json(await self._call_ai(prompt, max_tokens=1000))
+        except Exception as e:
+            logger.error(f"Consolidated analysis failed: {e}")
+            data = {}
+        
+        summary = data.get("executive_summary")
+        if not isinstance(summary, str) or not summary.strip():
+            summary = self._generate_fallback_summary(project_data)
+        
+        scores = self._validate_scores(data.get("scores")) or self._generate_fallback_scores(project_data)
+        risk = self._validate_risk(data.get("risk_flags")) or self._generate_fallback_risk_analysis(project_data)
+        thesis = self._validate_thesis(data.get("investment_thesis")) or self._generate_fallback_thesis(project_data, scores)
+        
+        return {
+            "executive_summary": summary.strip(),
+            "scores": scores,
+            "risk_flags": risk,
+            "investment_thesis": thesis,
+        }
+    
     async def generate_executive_summary(self, project_data: Dict) -> str:
         """Generate 100-word executive summary using ROMA"""
         try:
@@ -27,9 +148,9 @@ Analyze this crypto project and provide a concise 100-word executive summary:
 
 Project: {project_data.get('project_name')}
 Description: {project_data.get('description', 'N/A')}
-Price: ${project_data.get('token_metrics', {}).get('price', 'N/A')}
-Market Cap: ${project_data.get('token_metrics', {}).get('market_cap', 'N/A')}
-24h Volume: ${project_data.get('token_metrics', {}).get('volume_24h', 'N/A')}
+Price: ${self._fmt(project_data.get('token_metrics', {}).get('price'))}
+Market Cap: ${self._fmt(project_data.get('token_metrics', {}).get('market_cap'))}
+24h Volume: ${self._fmt(project_data.get('token_metrics', {}).get('volume_24h'))}
 
 Provide a professional, objective summary covering: what the project does, key metrics, and notable observations.
 """
@@ -54,12 +175,12 @@ Analyze this crypto project and provide scores (0-10) for these categories:
 
 Project Data:
 - Name: {project_data.get('project_name')}
-- GitHub Stars: {project_data.get('technical_metrics', {}).get('github_stars', 'N/A')}
-- Contributors: {project_data.get('technical_metrics', {}).get('contributors', 'N/A')}
-- Commits (Last Month): {project_data.get('technical_metrics', {}).get('commits_last_month', 'N/A')}
-- Twitter Followers: {project_data.get('social_metrics', {}).get('twitter_followers', 'N/A')}
-- Market Cap: ${project_data.get('token_metrics', {}).get('market_cap', 'N/A')}
-- 24h Volume: ${project_data.get('token_metrics', {}).get('volume_24h', 'N/A')}
+- GitHub Stars: {self._fmt(project_data.get('technical_metrics', {}).get('github_stars'))}
+- Contributors: {self._fmt(project_data.get('technical_metrics', {}).get('contributors'))}
+- Commits (Last Month): {self._fmt(project_data.get('technical_metrics', {}).get('commits_last_month'))}
+- Twitter Followers: {self._fmt(project_data.get('social_metrics', {}).get('twitter_followers'))}
+- Market Cap: ${self._fmt(project_data.get('token_metrics', {}).get('market_cap'))}
+- 24h Volume: ${self._fmt(project_data.get('token_metrics', {}).get('volume_24h'))}
 
 Respond in JSON format:
 {{
@@ -72,8 +193,9 @@ Respond in JSON format:
 """
             
             response = await self._call_ai(prompt, max_tokens=200)
-            scores = json.loads(response)
-            scores["total"] = sum(scores.values())
+            scores = self._validate_scores(self._parse_json(response))
+            if not scores:
+                raise ValueError("Invalid scores in AI response")
             return scores
         except Exception as e:
             logger.error(f"Error calculating scores: {e}")
@@ -86,9 +208,9 @@ Respond in JSON format:
 Analyze this crypto project for risk factors:
 
 Project: {project_data.get('project_name')}
-Market Cap: ${project_data.get('token_metrics', {}).get('market_cap', 'N/A')}
-Volume 24h: ${project_data.get('token_metrics', {}).get('volume_24h', 'N/A')}
-Holders: {project_data.get('token_metrics', {}).get('holders', 'N/A')}
+Market Cap: ${self._fmt(project_data.get('token_metrics', {}).get('market_cap'))}
+Volume 24h: ${self._fmt(project_data.get('token_metrics', {}).get('volume_24h'))}
+Holders: {self._fmt(project_data.get('token_metrics', {}).get('holders'))}
 Last GitHub Commit: {project_data.get('technical_metrics', {}).get('last_commit_date', 'N/A')}
 
 Identify risk flags and assign overall risk level (green/yellow/red).
@@ -101,7 +223,10 @@ Respond in JSON format:
 """
             
             response = await self._call_ai(prompt, max_tokens=300)
-            return json.loads(response)
+            risk = self._validate_risk(self._parse_json(response))
+            if not risk:
+                raise ValueError("Invalid risk analysis in AI response")
+            return risk
         except Exception as e:
             logger.error(f"Error analyzing risks: {e}")
             return self._generate_fallback_risk_analysis(project_data)
@@ -114,8 +239,8 @@ Create an investment thesis for this crypto project:
 
 Project: {project_data.get('project_name')}
 Total Score: {scores.get('total', 0)}/50
-Market Cap: ${project_data.get('token_metrics', {}).get('market_cap', 'N/A')}
-Community: {project_data.get('social_metrics', {}).get('twitter_followers', 'N/A')} followers
+Market Cap: ${self._fmt(project_data.get('token_metrics', {}).get('market_cap'))}
+Community: {self._fmt(project_data.get('social_metrics', {}).get('twitter_followers'))} followers
 
 Provide:
 1. Bull Case (3-4 key points)
@@ -131,7 +256,10 @@ Respond in JSON format:
 """
             
             response = await self._call_ai(prompt, max_tokens=400)
-            return json.loads(response)
+            thesis = self._validate_thesis(self._parse_json(response))
+            if not thesis:
+                raise ValueError("Invalid investment thesis in AI response")
+            return thesis
         except Exception as e:
             logger.error(f"Error generating thesis: {e}")
             return self._generate_fallback_thesis(project_data, scores)
@@ -141,28 +269,98 @@ Respond in JSON format:
         if not self.api_key:
             raise Exception("OpenRouter API key not configured")
         
+        # Identical prompts are answered from the completion cache
+        cache_key = completion_cache.fingerprint(self.MODEL, self.SYSTEM_PROMPT, prompt, max_tokens)
+        cached = await completion_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    f"{self.BASE_URL}/chat/completions",
-                    headers=self.headers,
-                    json={
-                        "model": "openai/gpt-3.5-turbo",
-                        "messages": [
-                            {"role": "system", "content": "You are a crypto analyst AI that provides concise, objective analysis."},
-                            {"role": "user", "content": prompt}
-                        ],
-                        "max_tokens": max_tokens,
-                        "temperature": 0.7
-                    }
+            started = time.monotonic()
+            client = self.http.get(self.BASE_URL)
+            response = await rate_limiter.request(
+                "openrouter",
+                client.post,
+                f"{self.BASE_URL}/chat/completions",
+                headers=self.headers,
+                json={
+                    "model": self.MODEL,
+                    "messages": [
+                        {"role": "system", "content": self.SYSTEM_PROMPT},
+                        {"role": "user", "content": prompt}
+                    ],
+                    "max_tokens": max_tokens,
+                    "temperature": 0.7
+                },
+                timeout=30.0
+            )
+            response.raise_for_status()
+            data = response.json()
+            content = data.get("choices", [{}])[0].get("message", {}).get("content", "").strip()
+            
+            if content:
+                await completion_cache.set(
+                    cache_key,
+                    content,
+                    latency=time.monotonic() - started,
+                    tokens=(data.get("usage") or {}).get("total_tokens", 0)
                 )
-                response.raise_for_status()
-                data = response.json()
-                return data.get("choices", [{}])[0].get("message", {}).get("content", "").strip()
+            return content
         except Exception as e:
             logger.error(f"OpenRouter API call failed: {e}")
             raise
     
+    def _fmt(self, value) -> str:
+        """Format a metric for a prompt, bucketed when LLM_CACHE_QUANTIZE is on"""
+        if value is None:
+            return "N/A"
+        if settings.LLM_CACHE_QUANTIZE:
+            return str(quantize(value))
+        return str(value)
+    
+    def _parse_json(self, response: str) -> Dict:
+        """Parse a JSON object from a completion, tolerating code fences and surrounding prose"""
+        match = re.search(r"\{.*\}", response, re.DOTALL)
+        data = json.loads(match.group(0) if match else response)
+        if not isinstance(data, dict):
+            raise ValueError("Expected a JSON object")
+        return data
+    
+    def _validate_scores(self, scores) -> Optional[Dict[str, int]]:
+        keys = ["team_credibility", "product_market_fit", "tokenomics_health", "community_strength", "technical_development"]
+        if not isinstance(scores, dict):
+            return None
+        try:
+            validated = {key: int(scores[key]) for key in keys}
+        except (KeyError, TypeError, ValueError):
+            return None
+        if any(not 0 <= value <= 10 for value in validated.values()):
+            return None
+        validated["total"] = sum(validated.values())
+        return validated
+    
+    def _validate_risk(self, risk) -> Optional[Dict]:
+        if not isinstance(risk, dict) or risk.get("level") not in ("green", "yellow", "red"):
+            return None
+        flags = risk.get("flags", [])
+        if not isinstance(flags, list):
+            return None
+        return {"level": risk["level"], "flags": [str(flag) for flag in flags]}
+    
+    def _validate_thesis(self, thesis) -> Optional[Dict]:
+        if not isinstance(thesis, dict):
+            return None
+        bull_case = thesis.get("bull_case")
+        bear_case = thesis.get("bear_case")
+        recommendation = thesis.get("recommendation")
+        if not isinstance(bull_case, list) or not isinstance(bear_case, list) or not isinstance(recommendation, str):
+            return None
+        return {
+            "bull_case": [str(point) for point in bull_case],
+            "bear_case": [str(point) for point in bear_case],
+            "recommendation": recommendation
+        }
+    
     # Fallback methods when ROMA API is unavailable
     def _generate_fallback_summary(self, project_data: Dict) -> str:
         """Generate basic summary without AI"""
@@ -170,44 +368,15 @@ Respond in JSON format:
         price = project_data.get('token_metrics', {}).get('price')
         mcap = project_data.get('token_metrics', {}).get('market_cap')
         
-        return f"{name} is a cryptocurrency project with a current price of ${price:.4f if price else 0} and market cap of ${mcap:,.0f if mcap else 0}. The project shows activity in development and community engagement. Further analysis is recommended for investment decisions."
+        return f"{name} is a cryptocurrency project with a current price of ${price or 0:.4f} and market cap of ${mcap or 0:,.0f}. The project shows activity in development and community engagement. Further analysis is recommended for investment decisions."
     
     def _generate_fallback_scores(self, project_data: Dict) -> Dict[str, int]:
-        """Generate basic scores based on available metrics"""
-        metrics = {
-            "team_credibility": 5,
-            "product_market_fit": 5,
-            "tokenomics_health": 5,
-            "community_strength": 5,
-            "technical_development": 5
-        }
-        
-        # Adjust based on available data
-        if project_data.get('technical_metrics', {}).get('github_stars', 0) > 1000:
-            metrics["technical_development"] += 2
-        if project_data.get('social_metrics', {}).get('twitter_followers', 0) > 10000:
-            metrics["community_strength"] += 2
-        
-        metrics["total"] = sum(v for k, v in metrics.items() if k != "total")
-        return metrics
+        """Deterministic scores, the same ones /quick-score serves"""
+        return self.scoring.calculate_scores(project_data)
     
     def _generate_fallback_risk_analysis(self, project_data: Dict) -> Dict:
-        """Generate basic risk analysis"""
-        flags = []
-        level = "yellow"
-        
-        if not project_data.get('technical_metrics', {}).get('github_stars'):
-            flags.append("No public GitHub repository found")
-        
-        if project_data.get('token_metrics', {}).get('volume_24h', 0) < 100000:
-            flags.append("Low trading volume")
-        
-        if len(flags) == 0:
-            level = "green"
-        elif len(flags) > 2:
-            level = "red"
-        
-        return {"level": level, "flags": flags}
+        """Deterministic risk flags, the same ones /quick-score serves"""
+        return self.scoring.analyze_risk_flags(project_data)
     
     def _generate_fallback_thesis(self, project_data: Dict, scores: Dict) -> Dict:
         """Generate basic investment thesis"""
@@ -0,0 +1,90 @@
+from typing import Dict
+
+
+class ScoringService:
+    """
+    Deterministic, LLM-free scoring engine.
+    
+    Backs /quick-score and ROMAService's fallback scores and risk analysis.
+    Missing metrics never raise; they simply do not move the score.
+    """
+    
+    def calculate_scores(self, project_data: Dict) -> Dict[str, int]:
+        """Score the five categories (0-10) from market, repo and social data"""
+        token = project_data.get('token_metrics') or {}
+        tokenomics = project_data.get('tokenomics') or {}
+        technical = project_data.get('technical_metrics') or {}
+        social = project_data.get('social_metrics') or {}
+        
+        scores = {
+            "team_credibility": 5,
+            "product_market_fit": 5,
+            "tokenomics_health": 5,
+            "community_strength": 5,
+            "technical_development": 5
+        }
+        
+        # Technical development
+        if (technical.get('github_stars') or 0) > 1000:
+            scores["technical_development"] += 2
+        if (technical.get('commits_last_month') or 0) > 50:
+            scores["technical_development"] += 1
+        if (technical.get('contributors') or 0) > 100:
+            scores["technical_development"] += 1
+            scores["team_credibility"] += 1
+        
+        # Community
+        if (social.get('twitter_followers') or 0) > 10000:
+            scores["community_strength"] += 2
+        
+        # Product-market fit from market size and liquidity
+        market_cap = token.get('market_cap') or 0
+        volume = token.get('volume_24h') or 0
+        if market_cap > 1_000_000_000:
+            scores["product_market_fit"] += 2
+        elif market_cap > 100_000_000:
+            scores["product_market_fit"] += 1
+        elif market_cap and market_cap < 10_000_000:
+            scores["product_market_fit"] -= 1
+        
+        # Tokenomics from turnover and float
+        if market_cap and 0.01 <= volume / market_cap <= 0.5:
+            scores["tokenomics_health"] += 1
+        circulating = tokenomics.get('circulating_supply') or 0
+        total_supply = tokenomics.get('total_supply') or 0
+        if total_supply and circulating / total_supply >= 0.5:
+            scores["tokenomics_health"] += 1
+        
+        scores = {k: max(0, min(10, v)) for k, v in scores.items()}
+        scores["total"] = sum(scores.values())
+        return scores
+    
+    def analyze_risk_flags(self, project_data: Dict) -> Dict:
+        """Flag risks from the same metrics and assign a green/yellow/red level"""
+        token = project_data.get('token_metrics') or {}
+        technical = project_data.get('technical_metrics') or {}
+        flags = []
+        
+        if not technical.get('github_stars'):
+            flags.append("No public GitHub repository found")
+        elif technical.get('commits_last_month') == 0:
+            flags.append("No commits in the last month")
+        
+        if (token.get('volume_24h') or 0) < 100000:
+            flags.append("Low trading volume")
+        
+        market_cap = token.get('market_cap')
+        if market_cap is not None and market_cap < 10_000_000:
+            flags.append("Small market cap")
+        
+        if abs(token.get('price_change_24h') or 0) > 20:
+            flags.append("Sharp 24h price move")
+        
+        if len(flags) == 0:
+            level = "green"
+        elif len(flags) > 2:
+            level = "red"
+        else:
+            level = "yellow"
+        
+        return {"level": level, "flags": flags}
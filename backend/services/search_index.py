@@ -0,0 +1,29 @@
+from bisect import bisect_left
+from typing import Iterable, List, Optional, Tuple
+import re
+
+
+def normalize_name(value: Optional[str]) -> str:
+    """Lowercase and strip everything but letters and digits"""
+    return re.sub(r"[^a-z0-9]", "", (value or "").lower())
+
+
+class PrefixIndex:
+    """
+    Sorted (key, position) arrays answering prefix queries with bisect.
+    
+    Positions refer to the caller's own entry arrays; callers that order their
+    entries by preference (TVL, market-cap rank) get the best match as the
+    smallest position.
+    """
+    
+    def __init__(self, pairs: Iterable[Tuple[str, int]] = ()):
+        pairs = sorted(set(pairs))
+        self._keys: List[str] = [key for key, _ in pairs]
+        self._positions: List[int] = [position for _, position in pairs]
+    
+    def matching(self, prefix: str) -> List[int]:
+        """Positions of every key starting with `prefix` (in key order, may repeat)"""
+        lo = bisect_left(self._keys, prefix)
+        hi = bisect_left(self._keys, prefix + "\uffff", lo)
+        return self._positions[lo:hi]
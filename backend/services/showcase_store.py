@@ -0,0 +1,115 @@
+from typing import Callable, Dict, List, Optional, Tuple
+from config import settings
+import hashlib
+import json
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Pre-JSONL showcase file, migrated on first use
+LEGACY_SHOWCASE_FILE = "showcase_projects.json"
+
+
+def make_etag(content: bytes) -> str:
+    return f'"{hashlib.sha1(content).hexdigest()[:16]}"'
+
+
+class ShowcaseStore:
+    """
+    Append-only showcase store (JSON Lines) with an in-memory snapshot.
+    
+    Each added project is one line written with a single O_APPEND write, so
+    concurrent writers (threads or worker processes) never overwrite each
+    other. Reads are served from memory and reloaded only when the file's
+    mtime or size changes; every snapshot carries an ETag of its content.
+    """
+    
+    def __init__(self, path: Optional[str] = None, legacy_path: str = LEGACY_SHOWCASE_FILE):
+        self.path = path or os.path.join(settings.DATA_DIR, "showcase.jsonl")
+        self.legacy_path = legacy_path
+        self._lock = threading.Lock()
+        self._signature: Optional[Tuple[int, int]] = None
+        self._projects: List[Dict] = []
+        self._etag = make_etag(b"")
+        self._migrated = False
+    
+    def snapshot(self, default: Optional[Callable[[], List[Dict]]] = None) -> Tuple[List[Dict], str]:
+        """(projects, etag); `default()` is served while the store is empty"""
+        with self._lock:
+            self._migrate()
+            self._reload_if_changed()
+            if self._projects or default is None:
+                return self._projects, self._etag
+        
+        projects = default()
+        return projects, make_etag(json.dumps(projects, sort_keys=True).encode())
+    
+    def append(self, project: Dict):
+        """Durably add one project"""
+        line = (json.dumps(project, default=str) + "\n").encode()
+        with self._lock:
+            self._migrate()
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, line)
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            self._signature = None  # reload on next read
+    
+    def _reload_if_changed(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self._signature, self._projects, self._etag = None, [], make_etag(b"")
+            return
+        
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature == self._signature:
+            return
+        
+        with open(self.path, "rb") as f:
+            content = f.read()
+        
+        projects = []
+        for number, line in enumerate(content.splitlines(), 1):
+            if not line.strip():
+                continue
+            try:
+                projects.append(json.loads(line))
+            except ValueError:
+                # A torn final line from a crashed writer; skip it
+                logger.warning(f"Skipping malformed showcase entry at line {number}")
+        
+        self._signature, self._projects, self._etag = signature, projects, make_etag(content)
+    
+    def _migrate(self):
+        """Convert the legacy JSON array file into JSON Lines (once)"""
+        if self._migrated:
+            return
+        self._migrated = True
+        if os.path.exists(self.path) or not os.path.exists(self.legacy_path):
+            return
+        
+        try:
+            with open(self.legacy_path, "r") as f:
+                projects = json.load(f)
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                for project in projects:
+                    f.write(json.dumps(project, default=str) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            os.replace(self.legacy_path, f"{self.legacy_path}.migrated")
+            logger.info(f"Migrated {len(projects)} showcase projects to {self.path}")
+        except Exception as e:
+            logger.error(f"Error migrating showcase projects: {e}")
+
+
+# Shared showcase store
+showcase_store = ShowcaseStore()
@@ -0,0 +1,143 @@
+from typing import Callable, Dict, List, Optional
+from config import settings
+from services.aggregation_service import AggregationService
+import asyncio
+import json
+import logging
+import os
+import time
+
+try:
+    import fcntl
+except ImportError:  # not on Windows: every worker warms
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class ShowcaseWarmer:
+    """
+    Background scheduler that keeps showcase projects analyzed.
+    
+    Every settings.SHOWCASE_WARM_INTERVAL seconds (kept below
+    ANALYSIS_CACHE_FRESH) each showcase project is re-analyzed through the
+    aggregation service's analysis cache, at most settings.SHOWCASE_WARM_CONCURRENCY
+    at a time. Clicking through to a showcase project's /analyze is then served
+    warm, and the showcase list shows the live score and risk level instead of
+    its static values.
+    
+    Only the worker holding the lock file in DATA_DIR warms; it shares the live
+    values through a JSON file the other workers read.
+    """
+    
+    def __init__(self, aggregation: AggregationService, projects: Callable[[], List[Dict]]):
+        self.aggregation = aggregation
+        self.projects = projects
+        self.live: Dict[str, Dict] = {}
+        self.last_run: Optional[float] = None
+        self.lock_path = os.path.join(settings.DATA_DIR, "showcase_warmer.lock")
+        self.live_path = os.path.join(settings.DATA_DIR, "showcase_live.json")
+        self._lock_file = None
+        self._task: Optional[asyncio.Task] = None
+    
+    @property
+    def interval(self) -> float:
+        """Seconds between runs, short enough that warmed entries never go stale"""
+        return min(settings.SHOWCASE_WARM_INTERVAL, settings.ANALYSIS_CACHE_FRESH * 0.8)
+    
+    async def warm_all(self):
+        """Analyze every showcase project once"""
+        semaphore = asyncio.Semaphore(settings.SHOWCASE_WARM_CONCURRENCY)
+        projects = await asyncio.to_thread(self.projects)
+        
+        async def warm(project: Dict):
+            async with semaphore:
+                try:
+                    analysis = await self.aggregation.warm_analysis(
+                        project["name"], "project_name", margin=self.interval
+                    )
+                except Exception as e:
+                    logger.error(f"Error warming showcase project {project.get('name')}: {e}")
+                    return
+                self.live[project["name"]] = {
+                    "score": analysis.scores.total,
+                    "risk": analysis.risk_flags.level,
+                    "price": analysis.project_data.token_metrics.price,
+                    "price_change_24h": analysis.project_data.token_metrics.price_change_24h,
+                    "updated_at": analysis.analysis_timestamp,
+                }
+        
+        started = time.time()
+        await asyncio.gather(*(warm(project) for project in projects if project.get("name")))
+        self.last_run = time.time()
+        logger.info(f"Warmed {len(projects)} showcase projects in {self.last_run - started:.1f}s")
+    
+    def merge(self, projects: List[Dict]) -> List[Dict]:
+        """Showcase entries with live scores from the last warm run, where available"""
+        return [{**project, **self.live.get(project.get("name"), {})} for project in projects]
+    
+    def _acquire(self) -> bool:
+        """Take (or keep) the warmer lock; False while another worker holds it"""
+        if self._lock_file is not None or fcntl is None:
+            return True
+        os.makedirs(settings.DATA_DIR, exist_ok=True)
+        lock_file = open(self.lock_path, "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        logger.info(f"Showcase warmer running in worker {os.getpid()}")
+        return True
+    
+    def _release(self):
+        if self._lock_file is not None:
+            # Closing the file drops the lock
+            self._lock_file.close()
+            self._lock_file = None
+    
+    def _save_live(self):
+        tmp_path = f"{self.live_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.live, f, default=str)
+        os.replace(tmp_path, self.live_path)
+    
+    def _load_live(self):
+        try:
+            with open(self.live_path, "r") as f:
+                self.live = json.load(f)
+        except FileNotFoundError:
+            pass
+    
+    async def run(self):
+        while True:
+            try:
+                if await asyncio.to_thread(self._acquire):
+                    await self.warm_all()
+                    await asyncio.to_thread(self._save_live)
+                else:
+                    # Another worker warms; pick up its live values
+                    await asyncio.to_thread(self._load_live)
+            except Exception as e:
+                logger.error(f"Showcase warm run failed: {e}")
+            await asyncio.sleep(self.interval)
+    
+    def start(self):
+        if settings.SHOWCASE_WARM_ENABLED and self._task is None:
+            if settings.SHOWCASE_WARM_INTERVAL >= settings.ANALYSIS_CACHE_FRESH:
+                logger.warning(
+                    f"SHOWCASE_WARM_INTERVAL ({settings.SHOWCASE_WARM_INTERVAL}s) is not below "
+                    f"ANALYSIS_CACHE_FRESH ({settings.ANALYSIS_CACHE_FRESH}s); warming every {self.interval:.0f}s"
+                )
+            self._task = asyncio.ensure_future(self.run())
+    
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._release()
@@ -0,0 +1,177 @@
+from typing import Dict, List, Optional
+from config import settings
+from services.coingecko_service import CoinGeckoService
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Market fields kept for every watched coin, with their column types
+MARKET_FIELDS = {
+    "price": "REAL",
+    "market_cap": "REAL",
+    "volume_24h": "REAL",
+    "price_change_24h": "REAL",
+    "price_change_7d": "REAL",
+    "market_cap_rank": "INTEGER",
+}
+
+
+class Watchlist:
+    """Persistent watchlist (SQLite) with the latest market snapshot per coin"""
+    
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or os.path.join(settings.DATA_DIR, "watchlist.db")
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+    
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=5)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS watchlist ("
+                "coin_id TEXT PRIMARY KEY, name TEXT, symbol TEXT, added_at REAL, updated_at REAL, checked_at REAL, "
+                f"{', '.join(f'{field} {kind}' for field, kind in MARKET_FIELDS.items())})"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS watchlist_checked ON watchlist (checked_at)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+    
+    def add(self, coin_id: str, name: str) -> bool:
+        """Watch a coin; returns False if it was already watched"""
+        with self._lock:
+            db = self._db()
+            cursor = db.execute(
+                "INSERT OR IGNORE INTO watchlist (coin_id, name, added_at) VALUES (?, ?, ?)",
+                (coin_id, name, time.time())
+            )
+            db.commit()
+        return cursor.rowcount > 0
+    
+    def remove(self, coin_id: str) -> bool:
+        with self._lock:
+            db = self._db()
+            cursor = db.execute("DELETE FROM watchlist WHERE coin_id = ?", (coin_id,))
+            db.commit()
+        return cursor.rowcount > 0
+    
+    def all(self) -> List[Dict]:
+        with self._lock:
+            rows = self._db().execute("SELECT * FROM watchlist ORDER BY added_at").fetchall()
+        return [dict(row) for row in rows]
+    
+    def due(self, checked_before: float) -> List[str]:
+        """Ids of coins never refreshed or last refreshed before `checked_before`"""
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT coin_id FROM watchlist WHERE checked_at IS NULL OR checked_at < ?", (checked_before,)
+            ).fetchall()
+        return [row["coin_id"] for row in rows]
+    
+    def update_markets(self, coin_ids: List[str], markets: Dict[str, Dict]):
+        """
+        Store one market snapshot per coin in a single transaction
+        
+        Every requested coin is marked as checked, so coins the upstream no
+        longer lists are retried next cycle rather than on every refresh.
+        """
+        now = time.time()
+        rows = [
+            (market.get("name"), market.get("symbol"), now, *(market.get(field) for field in MARKET_FIELDS), coin_id)
+            for coin_id, market in markets.items()
+        ]
+        assignments = ", ".join(f"{field} = ?" for field in MARKET_FIELDS)
+        with self._lock:
+            db = self._db()
+            db.executemany("UPDATE watchlist SET checked_at = ? WHERE coin_id = ?", [(now, coin_id) for coin_id in coin_ids])
+            db.executemany(
+                "UPDATE watchlist SET name = COALESCE(?, name), symbol = ?, updated_at = ?, "
+                f"{assignments} WHERE coin_id = ?",
+                rows
+            )
+            db.commit()
+    
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+class WatchlistMonitor:
+    """
+    Refreshes market data for every watched coin on a schedule.
+    
+    All due coins are fetched through CoinGeckoService.get_markets, i.e. one
+    /coins/markets call per 250 coins, so thousands of watched tickers cost a
+    handful of upstream calls per cycle. Newly added coins wake the monitor
+    early; additions arriving together are refreshed in the same batch.
+    """
+    
+    # Wait for more additions before refreshing new coins
+    DEBOUNCE_SECONDS = 2.0
+    
+    def __init__(self, watchlist: Watchlist, coingecko: Optional[CoinGeckoService] = None):
+        self.watchlist = watchlist
+        self.coingecko = coingecko or CoinGeckoService()
+        self.last_refresh: Optional[float] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+    
+    async def refresh(self) -> int:
+        """Fetch markets for every due coin; returns the number of coins updated"""
+        coin_ids = await asyncio.to_thread(
+            self.watchlist.due, time.time() - settings.WATCHLIST_REFRESH_INTERVAL
+        )
+        if not coin_ids:
+            return 0
+        
+        markets = await self.coingecko.get_markets(coin_ids)
+        await asyncio.to_thread(self.watchlist.update_markets, coin_ids, markets)
+        self.last_refresh = time.time()
+        logger.info(f"Watchlist refreshed {len(markets)}/{len(coin_ids)} coins")
+        return len(markets)
+    
+    def notify(self):
+        """Refresh soon (after a new coin is added)"""
+        if self._wake is not None:
+            self._wake.set()
+    
+    async def run(self):
+        self._wake = asyncio.Event()
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Watchlist refresh failed: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=settings.WATCHLIST_REFRESH_INTERVAL)
+                await asyncio.sleep(self.DEBOUNCE_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+    
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self.run())
+    
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Shared watchlist and its monitor (started by the app lifespan)
+watchlist = Watchlist()
+watchlist_monitor = WatchlistMonitor(watchlist)
@@ -11,7 +11,7 @@ function App() {
   const [analysisData, setAnalysisData] = useState(null)
   const [loading, setLoading] = useState(false)
 
-  const handleSearch = async (searchInput) => {
+  const handleSearch = async (searchInput, inputType) => {
     setLoading(true)
     setAnalysisData(null)
 
@@ -23,6 +23,7 @@ function App() {
         },
         body: JSON.stringify({
           input: searchInput,
+          input_type: inputType,
         }),
       })
 
@@ -1,26 +1,76 @@
-import React, { useState } from 'react'
+import React, { useEffect, useRef, useState } from 'react'
 import { Search, Loader2 } from 'lucide-react'
 
 export default function SearchBar({ onSearch, loading }) {
   const [input, setInput] = useState('')
+  const [suggestions, setSuggestions] = useState([])
+  // Text filled in by a picked suggestion; it must not reopen the dropdown
+  const selected = useRef(null)
+
+  useEffect(() => {
+    const query = input.trim()
+    if (input === selected.current) {
+      return
+    }
+    // Only names and symbols get suggestions, not addresses or handles
+    if (query.length < 2 || query.startsWith('0x') || query.startsWith('@')) {
+      setSuggestions([])
+      return
+    }
+
+    const controller = new AbortController()
+    const timer = setTimeout(async () => {
+      try {
+        const response = await fetch(
+          `http://localhost:8000/api/v1/search?q=${encodeURIComponent(query)}&limit=6`,
+          { signal: controller.signal }
+        )
+        if (response.ok) {
+          setSuggestions(await response.json())
+        }
+      } catch (err) {
+        if (err.name !== 'AbortError') {
+          console.error('Error fetching suggestions:', err)
+        }
+      }
+    }, 150)
+
+    return () => {
+      clearTimeout(timer)
+      controller.abort()
+    }
+  }, [input])
 
   const handleSubmit = (e) => {
     e.preventDefault()
+    setSuggestions([])
     if (input.trim()) {
       onSearch(input.trim())
     }
   }
 
+  const selectSuggestion = (coin) => {
+    selected.current = coin.name
+    setInput(coin.name)
+    setSuggestions([])
+    // The id names the picked coin exactly; the name could match another one
+    onSearch(coin.id, 'coin_id')
+  }
+
   return (
     <form onSubmit={handleSubmit} className="w-full">
       <div className="relative">
         <input
           type="text"
           value={input}
-          onChange={(e) => setInput(e.target.value)}
+          onChange={(e) => {
+            selected.current = null
+            setInput(e.target.value)
+          }}
           placeholder="Enter project name, contract address, or @twitter..."
           className="w-full px-6 py-4 pr-32 text-lg rounded-2xl bg-white/95 backdrop-blur-sm shadow-2xl focus:outline-none focus:ring-4 focus:ring-white/50 transition-all"
           disabled={loading}
+          autoComplete="off"
         />
         <button
           type="submit"
@@ -39,6 +89,27 @@ export default function SearchBar({ onSearch, loading }) {
             </>
           )}
         </button>
+
+        {suggestions.length > 0 && !loading && (
+          <ul className="absolute z-10 left-0 right-0 mt-2 bg-white rounded-2xl shadow-2xl overflow-hidden text-left">
+            {suggestions.map((coin) => (
+              <li key={coin.id}>
+                <button
+                  type="button"
+                  onClick={() => selectSuggestion(coin)}
+                  className="w-full px-6 py-3 flex items-center justify-between hover:bg-gray-100 transition-all"
+                >
+                  <span className="font-medium text-gray-900">
+                    {coin.name} <span className="text-gray-500">{coin.symbol}</span>
+                  </span>
+                  {coin.market_cap_rank && (
+                    <span className="text-sm text-gray-400">#{coin.market_cap_rank}</span>
+                  )}
+                </button>
+              </li>
+            ))}
+          </ul>
+        )}
       </div>
 
       <div className="mt-4 flex flex-wrap gap-2 justify-center">
@@ -8,11 +8,15 @@ export default function Showcase({ onSelectProject }) {
 
   useEffect(() => {
     fetchShowcaseProjects()
+    // Poll for updates; unchanged lists are revalidated with a 304 via ETag
+    const interval = setInterval(fetchShowcaseProjects, 60000)
+    return () => clearInterval(interval)
   }, [])
 
   const fetchShowcaseProjects = async () => {
     try {
-      const response = await fetch('http://localhost:8000/api/v1/showcase')
+      const response = await fetch('http://localhost:8000/api/v1/showcase', { cache: 'no-cache' })
+      if (!response.ok) return
       const data = await response.json()
       setProjects(data)
     } catch (error) {